@@ -0,0 +1,174 @@
+"""Offline benchmark for BgRemove's GIF path.
+
+Run directly, no Discord connection needed::
+
+    python bgremove/bench.py
+    python bgremove/bench.py --frames 100 --batch 1 8 16 --json results.json
+    python bgremove/bench.py --gif some.gif
+
+Times the old frame-by-frame ``remove()`` loop (``--matting`` adds the
+alpha matting run the cog used to do per frame) against the batched path
+in ``frames.py`` and reports frames/s. Without ``--gif`` a seeded
+synthetic GIF is used, so runs on the same machine are comparable. Needs
+rembg and its u2net model; ``--model`` points at a local ONNX file instead
+of the one rembg downloads.
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import types
+from pathlib import Path
+
+import imageio
+import numpy as np
+from PIL import Image, ImageDraw, ImageSequence
+from rembg import new_session, remove
+
+HERE = Path(__file__).parent
+
+# The cog's __init__ pulls in Red, so load the helpers under a bare package
+_package = types.ModuleType("bgremove_bench")
+_package.__path__ = [str(HERE)]
+sys.modules.setdefault("bgremove_bench", _package)
+
+from bgremove_bench.frames import batch_limit, cut_out, decode_gif  # noqa: E402
+
+MATTING = {
+    "alpha_matting": True,
+    "alpha_matting_foreground_threshold": 240,
+    "alpha_matting_background_threshold": 10,
+    "alpha_matting_erode_size": 10,
+}
+
+# The text report goes to stderr when the JSON goes to stdout
+out = sys.stdout
+
+
+def log(*args):
+    print(*args, file=out)
+
+
+def make_gif(frames=100, size=256, seed=0):
+    """A ball bouncing across a noisy gradient, ``frames`` frames long."""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, size, dtype=np.float32)
+    images = []
+
+    for i in range(frames):
+        background = np.stack([
+            np.tile(gradient, (size, 1)),
+            np.tile(gradient[:, None], (1, size)),
+            np.full((size, size), 120, dtype=np.float32),
+        ], axis=-1)
+        background += rng.normal(0, 8, background.shape)
+
+        image = Image.fromarray(background.clip(0, 255).astype(np.uint8))
+        x = int(size * 0.2 + size * 0.6 * abs((i % 50) / 25 - 1))
+        ImageDraw.Draw(image).ellipse((x - 40, size // 2 - 40, x + 40, size // 2 + 40), fill=(220, 40, 40))
+        images.append(np.asarray(image))
+
+    buf = io.BytesIO()
+    imageio.mimsave(buf, images, format="GIF", duration=40, loop=0)
+    return buf.getvalue()
+
+
+def legacy_gif(session, data, **kwargs):
+    """The old loop: a PNG round trip and one ``remove()`` call per frame."""
+    frames = []
+
+    for frame in ImageSequence.Iterator(Image.open(io.BytesIO(data))):
+        frame_buf = io.BytesIO()
+        frame.convert("RGBA").save(frame_buf, format="PNG")
+
+        processed = remove(frame_buf.getvalue(), session=session, **kwargs)
+        frames.append(np.array(Image.open(io.BytesIO(processed)).convert("RGBA")))
+
+    return np.stack(frames)
+
+
+def batched_gif(session, data, batch_size):
+    frames, _ = decode_gif(data, max_frames=None)
+    return cut_out(session.inner_session, frames, batch_size)
+
+
+def timed(name, frames, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    log(f"  {name:<24} {elapsed:8.2f} s  {frames / elapsed:8.1f} frames/s")
+    return result, {"seconds": elapsed, "frames_per_second": frames / elapsed}
+
+
+def main():
+    global out
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gif", type=Path, help="time this GIF instead of a synthetic one")
+    parser.add_argument("--frames", type=int, default=100, help="synthetic GIF length")
+    parser.add_argument("--size", type=int, default=256, help="synthetic GIF width and height")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 16], help="batch sizes to time")
+    parser.add_argument("--matting", action="store_true", help="also time the old loop with alpha matting (slow)")
+    parser.add_argument("--model", type=Path, help="u2net-compatible ONNX file under rembg's model directory (~/.rembg), used instead of the download")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    if args.json == "-":
+        out = sys.stderr
+
+    data = args.gif.read_bytes() if args.gif else make_gif(args.frames, args.size, args.seed)
+    frames = len(decode_gif(data, max_frames=None)[0])
+
+    if args.model:
+        session = new_session("u2net_custom", model_path=str(args.model))
+    else:
+        session = new_session("u2net")
+    limit = batch_limit(session.inner_session)
+
+    log(f"{frames} frames, model batch dimension: {limit or 'dynamic'}")
+
+    # One untimed frame so model warmup doesn't land in the first number
+    remove(make_gif(1, 64), session=session)
+
+    results = {
+        "python": platform.python_version(),
+        "frames": frames,
+        "model": str(args.model) if args.model else "u2net",
+        "model_batch": limit,
+        "runs": {},
+    }
+
+    if args.matting:
+        _, results["runs"]["loop+matting"] = timed("loop + alpha matting", frames, legacy_gif, session, data, **MATTING)
+
+    reference, results["runs"]["loop"] = timed("loop", frames, legacy_gif, session, data)
+
+    for batch_size in args.batch:
+        name = f"batched x{batch_size}"
+        cut, results["runs"][name] = timed(name, frames, batched_gif, session, data, batch_size)
+
+        # Same model and same cutout, so only resampling differences remain
+        error = np.abs(cut[..., 3].astype(np.int16) - reference[..., 3]).mean()
+        results["runs"][name]["alpha_mean_abs_error"] = float(error)
+        log(f"  {'':<24} alpha differs from loop by {error:.2f}/255 on average")
+
+    loop = results["runs"]["loop"]["frames_per_second"]
+    best = max(run["frames_per_second"] for name, run in results["runs"].items() if name.startswith("batched"))
+    log(f"speedup over loop: {best / loop:.1f}x")
+
+    if args.json:
+        text = json.dumps(results, indent=2)
+
+        if args.json == "-":
+            print(text)
+        else:
+            Path(args.json).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
+import asyncio
 import discord
+import time
 from redbot.core import commands
 from rembg import remove, new_session
-from PIL import Image, ImageSequence
 import io
 import imageio
-import numpy as np
+
+from .frames import cut_out, decode_gif
+from .jobs import Job, JobQueue, QueueFull
 
 class BgRemove(commands.Cog):
-    """GPU-accelerated background removal with alpha matting."""
+    """GPU-accelerated background removal.
+
+    Still images get alpha matting; GIFs get the plain u2net cutout,
+    batched across frames.
+    """
 
     def __init__(self, bot):
         self.bot = bot
@@ -24,12 +31,30 @@ class BgRemove(commands.Cog):
             "alpha_matting_erode_size": 10
         }
 
-    @commands.command(name="bgremove")
+        # GIF frames per u2net run
+        self.gif_batch_size = 16
+
+        # Inference runs off the event loop; two jobs at once, one per guild
+        self.jobs = JobQueue(workers=2, per_guild=1, max_waiting=20)
+
+    async def cog_load(self):
+        self.jobs.start()
+
+    async def cog_unload(self):
+        await self.jobs.close()
+
+    @commands.group(name="bgremove", invoke_without_command=True)
     async def bgremove(self, ctx):
         """
         Remove the background from an attached image/GIF
         or from a replied-to message containing one.
         """
+        if self.jobs.find(ctx.author.id):
+            await ctx.send(
+                f"You already have a job queued. Use `{ctx.clean_prefix}bgremove cancel` to drop it."
+            )
+            return
+
         attachment = None
 
         # Direct attachment
@@ -55,56 +80,126 @@ class BgRemove(commands.Cog):
         filename = attachment.filename.lower()
 
         if filename.endswith(".gif"):
-            await ctx.send("Processing GIF with alpha matting…")
-            output = await self._process_gif(data)
-            await ctx.send(
-                file=discord.File(fp=output, filename="bgremoved.gif")
-            )
+            job = Job(ctx.guild.id if ctx.guild else 0, ctx.author.id, self._process_gif, data)
+            output_name = "bgremoved.gif"
         else:
-            output = await self._process_image(data)
-            await ctx.send(
-                file=discord.File(fp=output, filename="bgremoved.png")
+            job = Job(ctx.guild.id if ctx.guild else 0, ctx.author.id, self._process_image, data)
+            output_name = "bgremoved.png"
+
+        try:
+            await self.jobs.submit(job)
+        except QueueFull:
+            await ctx.send("Too many images are waiting already, try again in a bit.")
+            return
+
+        status = await ctx.send(self._status(ctx, job))
+        tracker = asyncio.create_task(self._track(ctx, job, status))
+
+        try:
+            await asyncio.wait({job.future})
+        finally:
+            tracker.cancel()
+
+        if job.future.cancelled():
+            await self._edit(status, "Cancelled.")
+            return
+
+        if job.future.exception() is not None:
+            await self._edit(status, f"Failed: {job.future.exception()}")
+            return
+
+        await self._edit(status, f"Done in {time.perf_counter() - job.started:.1f}s.")
+        await ctx.send(
+            file=discord.File(fp=job.future.result(), filename=output_name)
+        )
+
+    @bgremove.command(name="cancel")
+    async def bgremove_cancel(self, ctx):
+        """
+        Cancel your queued or running background removal.
+        """
+        job = self.jobs.find(ctx.author.id)
+
+        if job is None:
+            await ctx.send("You don't have a job queued.")
+            return
+
+        await self.jobs.cancel(job)
+        await ctx.send("Cancelling your job.")
+
+    def _status(self, ctx, job) -> str:
+        """
+        Status line for a job: queue position, then frames done.
+        """
+        if job.cancelled.is_set():
+            return "Cancelling…"
+
+        if not job.running:
+            return (
+                f"Queued, position {self.jobs.position(job)}. "
+                f"Use `{ctx.clean_prefix}bgremove cancel` to cancel."
             )
 
-    async def _process_image(self, data: bytes) -> io.BytesIO:
+        if job.total > 1:
+            return f"Processing GIF (no alpha matting)… frame {job.done}/{job.total}"
+
+        return "Processing image with alpha matting…"
+
+    async def _track(self, ctx, job, status, interval: float = 2.0):
+        """
+        Keep the status message current until the job finishes.
+        Edits only when the text changed, at most once per interval.
+        """
+        last = status.content
+
+        while not job.future.done():
+            await asyncio.wait({job.future}, timeout=interval)
+
+            text = self._status(ctx, job)
+
+            if text != last and not job.future.done():
+                await self._edit(status, text)
+                last = text
+
+    async def _edit(self, message, content: str):
+        try:
+            await message.edit(content=content)
+        except discord.HTTPException:
+            pass
+
+    def _process_image(self, data: bytes, job: Job) -> io.BytesIO:
         """
         Background removal for static images.
+        Runs on a job queue thread; a cancel mid-run drops the result.
         """
+        job.progress(0, 1)
+        job.check()
         result = remove(data, **self.remove_kwargs)
+        job.check()
+        job.progress(1, 1)
         buf = io.BytesIO(result)
         buf.seek(0)
         return buf
 
-    async def _process_gif(self, data: bytes) -> io.BytesIO:
+    def _process_gif(self, data: bytes, job: Job) -> io.BytesIO:
         """
-        Frame-by-frame background removal for GIFs.
+        Batched background removal for GIFs.
+        All frames are decoded into one array, then cut out in place
+        gif_batch_size at a time, so only one batch is ever held as
+        float tensors. GIFs over MAX_FRAMES frames are refused.
+        Alpha matting is per image and far too slow for every frame,
+        so GIFs get the plain u2net cutout.
+        Runs on a job queue thread; stops between batches once cancelled.
         """
-        gif = Image.open(io.BytesIO(data))
-        frames = []
-        durations = []
-
-        for frame in ImageSequence.Iterator(gif):
-            frame = frame.convert("RGBA")
-
-            frame_buf = io.BytesIO()
-            frame.save(frame_buf, format="PNG")
-
-            processed = remove(
-                frame_buf.getvalue(),
-                **self.remove_kwargs
-            )
-
-            processed_img = Image.open(
-                io.BytesIO(processed)
-            ).convert("RGBA")
+        frames, durations = decode_gif(data)
+        job.progress(0, len(frames))
 
-            frames.append(np.array(processed_img))
-            durations.append(frame.info.get("duration", 40))
+        cut_out(self.session.inner_session, frames, self.gif_batch_size, job)
 
         output = io.BytesIO()
         imageio.mimsave(
             output,
-            frames,
+            list(frames),
             format="GIF",
             duration=[d / 1000 for d in durations],
             loop=0,
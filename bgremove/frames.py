@@ -0,0 +1,114 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+# u2net's input size and ImageNet normalization, as rembg feeds it
+SIZE = (320, 320)
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 3, 1, 1)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 3, 1, 1)
+
+# Longest GIF accepted; decoded frames are held in memory until encoding
+MAX_FRAMES = 300
+
+
+def decode_gif(data, max_frames=MAX_FRAMES):
+    """Every frame of a GIF as one ``(frames, height, width, 4)`` uint8 array,
+    plus the frame durations in milliseconds.
+
+    Raises ``ValueError`` before decoding anything if the GIF has more
+    than ``max_frames`` frames.
+    """
+    gif = Image.open(io.BytesIO(data))
+    total = getattr(gif, "n_frames", 1)
+
+    if max_frames is not None and total > max_frames:
+        raise ValueError(f"GIF has {total} frames, the limit is {max_frames}")
+
+    frames = []
+    durations = []
+
+    for frame in ImageSequence.Iterator(gif):
+        frames.append(np.asarray(frame.convert("RGBA")))
+        durations.append(frame.info.get("duration", 40))
+
+    return np.stack(frames), durations
+
+
+def preprocess(frames):
+    """Turn RGBA frames into a ``(frames, 3, 320, 320)`` float32 u2net batch.
+
+    Matches rembg's per-image ``normalize``: resize, scale by the frame's
+    own maximum, then subtract the mean and divide by the std per channel.
+    """
+    resized = np.stack([
+        np.asarray(Image.fromarray(frame[..., :3]).resize(SIZE, Image.LANCZOS))
+        for frame in frames
+    ]).astype(np.float32)
+
+    peak = np.maximum(resized.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    batch = (resized / peak).transpose(0, 3, 1, 2)
+
+    return np.ascontiguousarray((batch - MEAN) / STD, dtype=np.float32)
+
+
+def batch_limit(session):
+    """How many images the model takes per run, or None if any number."""
+    size = session.get_inputs()[0].shape[0]
+    return size if isinstance(size, int) else None
+
+
+def predict(session, batch):
+    """Run one preprocessed batch through an ONNX u2net session.
+
+    Returns the saliency maps as ``(frames, 320, 320)`` floats, each scaled
+    to 0..1.
+    """
+    name = session.get_inputs()[0].name
+    maps = session.run(None, {name: batch})[0][:, 0]
+
+    low = maps.min(axis=(1, 2), keepdims=True)
+    high = maps.max(axis=(1, 2), keepdims=True)
+
+    return (maps - low) / np.maximum(high - low, 1e-6)
+
+
+def cut_out(session, frames, batch_size=16, job=None):
+    """Remove the background from ``frames`` in place, ``batch_size`` at a time.
+
+    Each slice is preprocessed, run and masked before the next one starts,
+    so the float tensors and temporaries only ever exist for one batch.
+    Models exported with a fixed batch dimension run one frame per call
+    instead. ``job`` gets progress after each run and a chance to stop.
+    """
+    step = batch_limit(session) or batch_size
+
+    for start in range(0, len(frames), step):
+        if job is not None:
+            job.check()
+
+        chunk = frames[start:start + step]
+        chunk[...] = apply_masks(chunk, predict(session, preprocess(chunk)))
+
+        if job is not None:
+            job.progress(start + len(chunk), len(frames))
+
+    return frames
+
+
+def apply_masks(frames, maps):
+    """Cut out ``frames`` with u2net ``maps``, resized back to frame size.
+
+    Every channel is blended towards transparent black by the mask, the
+    same as rembg's cutout compositing the frame over an empty image.
+    """
+    height, width = frames.shape[1:3]
+
+    masks = np.stack([
+        np.asarray(Image.fromarray((m * 255).astype(np.uint8)).resize((width, height), Image.LANCZOS))
+        for m in maps
+    ])
+
+    out = frames.astype(np.uint16) * masks[..., None]
+
+    return (out // 255).astype(np.uint8)
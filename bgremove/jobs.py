@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when a job is refused because too many are already waiting."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its owner cancels it."""
+
+
+class Job:
+    """One background removal request and its progress.
+
+    ``func(*args, job)`` runs on an executor thread. It reports progress
+    with ``job.progress`` and calls ``job.check`` between frames, which
+    raises ``JobCancelled`` once ``cancel`` was asked for.
+    """
+
+    def __init__(self, guild_id, user_id, func, *args):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+
+        self.cancelled = threading.Event()
+        self.future = asyncio.get_running_loop().create_future()
+
+        self.done = 0
+        self.total = 0
+        self.queued = time.perf_counter()
+        self.started = None
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    def progress(self, done, total):
+        self.done = done
+        self.total = total
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def run(self):
+        return self.func(*self.args, self)
+
+
+class JobQueue:
+    """Runs jobs on ``workers`` executor threads, oldest first.
+
+    At most ``workers`` jobs run at once overall and ``per_guild`` per
+    guild; a job whose guild is at its limit waits without holding up
+    jobs from other guilds behind it. Past ``max_waiting`` queued jobs new
+    ones are refused with ``QueueFull``.
+
+    rembg's ONNX session is shared by every thread. onnxruntime releases
+    the GIL while it runs, so threads overlap without each one loading a
+    copy of the model the way a process pool would.
+    """
+
+    def __init__(self, workers=2, per_guild=1, max_waiting=20):
+        self.workers = workers
+        self.per_guild = per_guild
+        self.max_waiting = max_waiting
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bgremove"
+        )
+        self.waiting = deque()
+        self.active = set()
+        self.running = Counter()
+        self.changed = asyncio.Condition()
+        self.tasks = []
+
+        self.processed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        active = list(self.active)
+
+        for job in active:
+            job.cancelled.set()
+
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+        for job in active:
+            job.future.cancel()
+
+        while self.waiting:
+            self.waiting.popleft().future.cancel()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, job):
+        if len(self.waiting) >= self.max_waiting:
+            raise QueueFull()
+
+        async with self.changed:
+            self.waiting.append(job)
+            self.changed.notify_all()
+
+    def position(self, job):
+        """1-based place of ``job`` among waiting jobs, or 0 once it runs."""
+        try:
+            return self.waiting.index(job) + 1
+        except ValueError:
+            return 0
+
+    def find(self, user_id):
+        for job in (*self.active, *self.waiting):
+            if job.user_id == user_id:
+                return job
+
+        return None
+
+    async def cancel(self, job):
+        async with self.changed:
+            if job in self.waiting:
+                self.waiting.remove(job)
+                job.future.cancel()
+                self.cancelled += 1
+                return
+
+        # Running: the worker thread stops at its next check
+        job.cancelled.set()
+
+    async def _next(self):
+        async with self.changed:
+            while True:
+                for job in self.waiting:
+                    if self.running[job.guild_id] < self.per_guild:
+                        self.waiting.remove(job)
+                        self.running[job.guild_id] += 1
+                        self.active.add(job)
+                        return job
+
+                await self.changed.wait()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job = await self._next()
+
+            try:
+                job.started = time.perf_counter()
+                result = await loop.run_in_executor(self.executor, job.run)
+            except JobCancelled:
+                self.cancelled += 1
+                if not job.future.done():
+                    job.future.cancel()
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.processed += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                async with self.changed:
+                    self.active.discard(job)
+                    self.running[job.guild_id] -= 1
+
+                    if not self.running[job.guild_id]:
+                        del self.running[job.guild_id]
+
+                    self.changed.notify_all()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "per_guild": self.per_guild,
+            "running": len(self.active),
+            "waiting": len(self.waiting),
+            "capacity": self.max_waiting,
+            "processed": self.processed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
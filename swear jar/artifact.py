@@ -0,0 +1,97 @@
+import hashlib
+import os
+import pickle
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from .normalize import NORMALIZER_VERSION
+from .pipeline import Detector
+
+# Bump whenever the layout of any compiled structure changes
+ARTIFACT_VERSION = 2
+
+MAGIC = b"SWEARJAR"
+
+HERE = Path(__file__).parent
+
+# Everything a compiled detector is built from besides the word list. The
+# stage settings (fuzzy threshold, phonetic guard, minimum lengths) live in
+# these sources, so changing any of them rebuilds the cache.
+BUILD_FILES = ("automaton.py", "fuzzy.py", "normalize.py", "phonetic.py", "pipeline.py", "commonwords.txt")
+BUILD_PACKAGES = ("jellyfish",)
+
+
+def build_fingerprint():
+    digest = hashlib.sha256()
+
+    for name in BUILD_FILES:
+        digest.update(name.encode() + b"\0")
+        digest.update((HERE / name).read_bytes())
+
+    for package in BUILD_PACKAGES:
+        try:
+            digest.update(f"{package}={version(package)}\n".encode())
+        except PackageNotFoundError:
+            digest.update(f"{package}=?\n".encode())
+
+    return digest.hexdigest()
+
+
+def artifact_key(badwords):
+    """Hash of the word list and everything that shapes its compiled form."""
+    digest = hashlib.sha256(f"{ARTIFACT_VERSION}:{NORMALIZER_VERSION}:{build_fingerprint()}\n".encode())
+
+    for word in badwords:
+        digest.update(word.encode())
+        digest.update(b"\n")
+
+    return digest.hexdigest()
+
+
+def read_artifact(path, key):
+    """Return the cached detector at ``path`` if it was built for ``key``."""
+    try:
+        with open(path, "rb") as f:
+            header = f.readline().split()
+
+            if header != [MAGIC, str(ARTIFACT_VERSION).encode(), key.encode()]:
+                return None
+
+            return pickle.loads(f.read())
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def write_artifact(path, key, detector):
+    tmp = path.with_name(path.name + ".tmp")
+
+    try:
+        with open(tmp, "wb") as f:
+            f.write(b" ".join([MAGIC, str(ARTIFACT_VERSION).encode(), key.encode()]) + b"\n")
+            f.write(pickle.dumps(detector, protocol=pickle.HIGHEST_PROTOCOL))
+
+        # Readers see the old file or the new one, never half of one
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def load_detector(badwords, path):
+    """Load the compiled detector for ``badwords``, rebuilding if stale.
+
+    Returns the detector and whether it came from the cache file.
+    """
+    key = artifact_key(badwords)
+
+    detector = read_artifact(path, key)
+
+    if detector is not None:
+        return detector, True
+
+    detector = Detector(badwords)
+    write_artifact(path, key, detector)
+
+    return detector, False
@@ -0,0 +1,180 @@
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+# What Whisper models expect
+SAMPLE_RATE = 16000
+
+
+class AudioRejected(Exception):
+    """Raised for clips that are too big or too long to transcribe."""
+
+
+def check_attachment(attachment, max_bytes, max_seconds):
+    """Reject an attachment from its metadata, before anything is downloaded."""
+    if attachment.size > max_bytes:
+        raise AudioRejected(f"{attachment.size} bytes is over the {max_bytes} byte limit")
+
+    # Only voice messages carry a duration
+    duration = getattr(attachment, "duration", None)
+
+    if duration is not None and duration > max_seconds:
+        raise AudioRejected(f"{duration:.0f}s is over the {max_seconds}s limit")
+
+
+def _ffmpeg(source, data, max_seconds, sample_rate):
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", source]
+
+    if max_seconds is not None:
+        cmd += ["-t", str(max_seconds + 1)]
+
+    cmd += ["-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "pipe:1"]
+
+    try:
+        return subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is not installed") from None
+
+
+def decode(data, max_seconds=None, sample_rate=SAMPLE_RATE):
+    """Decode an audio file held in memory to mono float32 samples.
+
+    ffmpeg reads the file from stdin and writes raw PCM to stdout, so
+    usually nothing touches the disk. Containers that need seeking, like
+    MP4/M4A with the index at the end, can't be read from a pipe; those
+    are retried from a temp file. The output matches ``whisper.load_audio``
+    and can be passed to ``model.transcribe`` as is. Decoding stops just
+    past ``max_seconds``, so a clip without a declared duration can't
+    make us decode an hour of audio before it's rejected.
+    """
+    try:
+        out = _ffmpeg("pipe:0", data, max_seconds, sample_rate)
+    except subprocess.CalledProcessError:
+        fd, path = tempfile.mkstemp()
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+            out = _ffmpeg(path, None, max_seconds, sample_rate)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace')[-200:]}") from None
+        finally:
+            os.unlink(path)
+
+    audio = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+    if max_seconds is not None and len(audio) > max_seconds * sample_rate:
+        raise AudioRejected(f"clip is over the {max_seconds}s limit")
+
+    return audio
+
+
+# ----------------------------
+# Voice activity detection
+# ----------------------------
+
+FRAME_SECONDS = 0.03
+
+
+def frame_energy(audio, frame):
+    """Energy in dBFS of each whole ``frame``-sample frame of ``audio``."""
+    n = len(audio) // frame
+    frames = audio[:n * frame].reshape(n, frame)
+
+    return 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+
+def speech_segments(audio, sample_rate=SAMPLE_RATE, floor_db=-45.0, margin_db=10.0,
+                    dynamic_range_db=30.0, min_silence=0.5, pad=0.2):
+    """Return ``(start, end)`` sample ranges of ``audio`` that hold speech.
+
+    A frame is speech when it is ``margin_db`` above the clip's noise floor
+    (its quietest tenth) or within ``dynamic_range_db`` of its loudest
+    frame, and above ``floor_db`` either way. The second test keeps a clip
+    with no pauses at all from being thrown away. Pauses shorter than
+    ``min_silence`` are kept and every range is padded by ``pad`` seconds,
+    so words are never clipped.
+    """
+    frame = int(FRAME_SECONDS * sample_rate)
+
+    if len(audio) < frame:
+        return [(0, len(audio))] if len(audio) else []
+
+    energy = frame_energy(audio, frame)
+
+    threshold = max(
+        floor_db,
+        min(np.percentile(energy, 10) + margin_db, energy.max() - dynamic_range_db)
+    )
+
+    voiced = np.flatnonzero(energy > threshold)
+
+    if not len(voiced):
+        return []
+
+    breaks = np.flatnonzero(np.diff(voiced) > max(1, int(min_silence / FRAME_SECONDS)))
+
+    starts = np.concatenate(([voiced[0]], voiced[breaks + 1])) * frame
+    ends = (np.concatenate((voiced[breaks], [voiced[-1]])) + 1) * frame
+
+    padding = int(pad * sample_rate)
+    segments = []
+
+    for start, end in zip(starts, ends):
+        start, end = max(0, start - padding), min(len(audio), end + padding)
+
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    return segments
+
+
+def quietest(audio, start, end, sample_rate=SAMPLE_RATE):
+    """Offset of the quietest frame in ``audio[start:end]``."""
+    frame = int(FRAME_SECONDS * sample_rate)
+
+    return start + int(np.argmin(frame_energy(audio[start:end], frame))) * frame
+
+
+def speech_chunks(audio, sample_rate=SAMPLE_RATE, max_seconds=30.0, **vad):
+    """Drop the silence from ``audio`` and cut the speech into chunks.
+
+    Chunks are at most ``max_seconds`` long, Whisper's window, so each
+    costs one encoder pass. Speech segments are packed into chunks in
+    order; a segment longer than a chunk is cut at its quietest frame in
+    the last third of the window rather than mid-word.
+    """
+    limit = int(max_seconds * sample_rate)
+    pieces = []
+
+    for start, end in speech_segments(audio, sample_rate, **vad):
+
+        while end - start > limit:
+            cut = quietest(audio, start + limit * 2 // 3, start + limit, sample_rate)
+            pieces.append((start, cut))
+            start = cut
+
+        pieces.append((start, end))
+
+    chunks = []
+    current = []
+    size = 0
+
+    for start, end in pieces:
+
+        if current and size + end - start > limit:
+            chunks.append(np.concatenate([audio[s:e] for s, e in current]))
+            current, size = [], 0
+
+        current.append((start, end))
+        size += end - start
+
+    if current:
+        chunks.append(np.concatenate([audio[s:e] for s, e in current]))
+
+    return chunks
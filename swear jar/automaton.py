@@ -0,0 +1,120 @@
+from collections import deque
+
+
+def is_word_char(ch):
+    """Mirror of the ``\\w`` test used by ``re`` for ``str`` patterns."""
+    return ch.isalnum() or ch == "_"
+
+
+class WordAutomaton:
+    """Aho-Corasick automaton over a fixed word list.
+
+    The whole list is compiled once, after which every occurrence of every
+    word (including multi-word phrases) is found in a single pass over the
+    text instead of one regex scan per word.
+    """
+
+    def __init__(self, words, whole_word=True):
+        self.words = list(words)
+        self.whole_word = whole_word
+
+        # Per-state transition table, failure link and output pattern ids
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for index, word in enumerate(self.words):
+            if word:
+                self._insert(word, index)
+
+        self._build_links()
+
+    def _insert(self, word, index):
+        state = 0
+
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+
+            state = nxt
+
+        self.output[state] += (index,)
+
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+
+                fallback = self.fail[state]
+
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+
+                link = self.goto[fallback].get(ch, 0)
+
+                self.fail[nxt] = link if link != nxt else 0
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def iter_matches(self, text):
+        """Yield ``(start, end, index)`` for each match, ordered by end.
+
+        With ``whole_word`` set, a match must satisfy ``\\b`` on both sides
+        exactly as ``re.findall(rf"\\b{re.escape(word)}\\b", text)`` would,
+        and matches of the same word never overlap.
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        words = self.words
+        whole_word = self.whole_word
+        size = len(text)
+
+        last_end = {}
+        state = 0
+
+        for pos, ch in enumerate(text):
+
+            while state and ch not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(ch, 0)
+
+            if not output[state]:
+                continue
+
+            end = pos + 1
+
+            for index in output[state]:
+
+                start = end - len(words[index])
+
+                if start < last_end.get(index, 0):
+                    continue
+
+                if whole_word:
+
+                    before = start > 0 and is_word_char(text[start - 1])
+                    after = end < size and is_word_char(text[end])
+
+                    if before == is_word_char(words[index][0]):
+                        continue
+
+                    if after == is_word_char(words[index][-1]):
+                        continue
+
+                last_end[index] = end
+
+                yield start, end, index
+
+    def count(self, text):
+        return sum(1 for _ in self.iter_matches(text))
@@ -0,0 +1,93 @@
+import importlib.util
+
+
+class WhisperBackend:
+    """openai-whisper in fp32 (fp16 on a GPU). The default."""
+
+    name = "whisper"
+    package = "openai-whisper"
+    module = "whisper"
+
+    def __init__(self, size):
+        self.size = size
+
+    def load(self):
+        # Imported here so loading the cog doesn't pull in torch
+        import whisper
+
+        return whisper.load_model(self.size)
+
+    def transcribe(self, model, audio):
+        return model.transcribe(audio)["text"]
+
+    def transcribe_batch(self, model, clips):
+        """Transcribe several clips with one batched Whisper encoder pass.
+
+        Each clip is padded to Whisper's 30 second window and the log-mel
+        spectrograms are stacked, so the encoder and decoder run once for
+        the whole batch instead of once per clip. Clips longer than the
+        window can't share a pass and go through ``transcribe`` on their own.
+        """
+        import torch
+        import whisper
+
+        short = [i for i, clip in enumerate(clips) if len(clip) <= whisper.audio.N_SAMPLES]
+        results = [None] * len(clips)
+
+        if short:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(clips[i]), model.dims.n_mels)
+                for i in short
+            ]).to(model.device)
+
+            options = whisper.DecodingOptions(fp16=model.device.type == "cuda", without_timestamps=True)
+
+            for i, result in zip(short, whisper.decode(model, mel, options)):
+                results[i] = result.text
+
+        for i, clip in enumerate(clips):
+            if results[i] is None:
+                results[i] = self.transcribe(model, clip)
+
+        return results
+
+
+class FasterWhisperBackend:
+    """faster-whisper on CTranslate2, int8 quantized on the CPU.
+
+    The same Whisper weights at a fraction of the memory, and usually
+    several times faster on hosts without a GPU. It has no cross-clip
+    batching, so the pool runs its jobs one at a time.
+    """
+
+    name = "faster-whisper"
+    package = "faster-whisper"
+    module = "faster_whisper"
+
+    transcribe_batch = None
+
+    def __init__(self, size, compute_type="int8"):
+        self.size = size
+        self.compute_type = compute_type
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(self.size, device="cpu", compute_type=self.compute_type)
+
+    def transcribe(self, model, audio):
+        # Greedy decoding, like openai-whisper's transcribe
+        segments, _ = model.transcribe(audio, beam_size=1)
+
+        return "".join(segment.text for segment in segments)
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, FasterWhisperBackend)}
+
+
+def installed(name):
+    return importlib.util.find_spec(BACKENDS[name].module) is not None
+
+
+def get_backend(name, size):
+    return BACKENDS[name](size)
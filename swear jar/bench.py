@@ -0,0 +1,1017 @@
+"""Offline benchmark harness for the SwearJar detection code.
+
+Run directly, no Discord connection needed::
+
+    python "swear jar/bench.py"
+    python "swear jar/bench.py" --json results.json
+    python "swear jar/bench.py" --legacy          # also time the old per-word loops
+    python "swear jar/bench.py" --audio fixtures  # also time transcription
+    python "swear jar/bench.py" --audio fixtures --backends
+
+The corpus is synthetic and seeded, so runs on the same machine are
+comparable. ``--json`` writes the same numbers as the text report.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import platform
+import random
+import tempfile
+import re
+import sys
+import time
+import types
+from collections import Counter
+from pathlib import Path
+
+HERE = Path(__file__).parent
+
+# The cog directory is not an importable name and its __init__ pulls in
+# Red, so expose the helper modules under a bare package instead.
+_package = types.ModuleType("swearjar_bench")
+_package.__path__ = [str(HERE)]
+sys.modules.setdefault("swearjar_bench", _package)
+
+AUDIO_SUFFIXES = (".ogg", ".oga", ".opus", ".mp3", ".wav", ".m4a", ".flac", ".webm")
+
+# The text report goes to stderr when the JSON goes to stdout
+out = sys.stdout
+
+
+def log(*args):
+    print(*args, file=out)
+
+
+def load(name):
+    return importlib.import_module(f"swearjar_bench.{name}")
+
+
+def load_badwords():
+    with open(HERE / "badwords.txt") as f:
+        return [w.strip().lower() for w in f if w.strip()]
+
+
+# ----------------------------
+# Statistics
+# ----------------------------
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+
+    rank = max(1, round(pct / 100 * len(values)))
+
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(samples):
+    """Throughput and latency (in ms) for a list of durations in seconds."""
+    values = sorted(samples)
+    total = sum(values)
+
+    return {
+        "count": len(values),
+        "per_second": len(values) / total if total else 0.0,
+        "mean_ms": total / len(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000 if values else 0.0,
+    }
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    results = [fn(text) for text in corpus]
+    return time.perf_counter() - start, results
+
+
+# ----------------------------
+# Corpus
+# ----------------------------
+
+FILLER = (
+    "the quick brown fox jumps over the lazy dog did you see the game "
+    "last night honestly that was wild lmao anyway i need to go to the "
+    "store and grab some food before the stream starts"
+).split()
+
+LEET = {"a": "@", "e": "3", "i": "1", "o": "0", "s": "$", "t": "7"}
+
+
+def leetify(word, rng):
+    """Obfuscate ``word`` the way people dodge filters."""
+    chars = []
+
+    for ch in word:
+        if ch in LEET and rng.random() < 0.5:
+            ch = LEET[ch]
+
+        chars.append(ch * rng.choice((1, 1, 1, 3)))
+
+    if rng.random() < 0.2:
+        chars.insert(rng.randrange(1, len(chars) + 1), "​")
+
+    return "".join(chars)
+
+
+def make_message(rng, length, swears=()):
+    words = rng.choices(FILLER, k=length)
+
+    for swear in swears:
+        words.insert(rng.randrange(len(words) + 1), swear)
+
+    return " ".join(words)
+
+
+def make_corpus(badwords, size=200, seed=1234):
+    """Return ``{category: [message, ...]}`` with ``size`` messages per category.
+
+    Long pastes are ten times rarer than the rest, as in real chat.
+    """
+    rng = random.Random(seed)
+
+    single = [w for w in badwords if " " not in w and w.isalpha()]
+    phrases = [w for w in badwords if " " in w]
+
+    corpus = {"clean": [], "profane": [], "leetspeak": [], "phrases": [], "long": []}
+
+    for _ in range(size):
+        corpus["clean"].append(make_message(rng, rng.randint(4, 40)))
+
+        corpus["profane"].append(make_message(
+            rng, rng.randint(4, 40), rng.choices(single, k=rng.randint(1, 3))
+        ))
+
+        corpus["leetspeak"].append(make_message(
+            rng, rng.randint(4, 40),
+            [leetify(w, rng) for w in rng.choices(single, k=rng.randint(1, 3))]
+        ))
+
+        corpus["phrases"].append(make_message(
+            rng, rng.randint(4, 40), rng.choices(phrases, k=rng.randint(1, 2))
+        ))
+
+    for _ in range(max(1, size // 10)):
+        corpus["long"].append(make_message(rng, 300, rng.choices(badwords, k=5)))
+
+    return corpus
+
+
+# ----------------------------
+# Detection stages
+# ----------------------------
+
+def bench_stages(badwords, corpus, matcher="both"):
+    pipeline = load("pipeline")
+
+    start = time.perf_counter()
+    detector = pipeline.Detector(badwords)
+    build = time.perf_counter() - start
+
+    stages = pipeline.MATCHER_STAGES[matcher]
+    results = {}
+
+    for category, messages in corpus.items():
+
+        samples = {"context_filter": [], **{stage: [] for stage in stages}, "total": []}
+        swears = 0
+
+        def record(stage, func, *args):
+            start = time.perf_counter()
+            result = func(*args)
+            samples[stage].append(time.perf_counter() - start)
+            return result
+
+        for message in messages:
+            start = time.perf_counter()
+
+            text = message.lower().strip()
+
+            filter_start = time.perf_counter()
+            checked = pipeline.context_filter(text)
+            samples["context_filter"].append(time.perf_counter() - filter_start)
+
+            if checked:
+                swears += len(detector.detect(text, stages, record))
+
+            samples["total"].append(time.perf_counter() - start)
+
+        results[category] = {
+            "messages": len(messages),
+            "swears": swears,
+            "stages": {stage: summarize(values) for stage, values in samples.items()},
+        }
+
+    log(f"detection stages (matcher {matcher}, detector build {build * 1000:.1f} ms)")
+
+    for category, result in results.items():
+        log(f"  {category}: {result['messages']} messages, {result['swears']} swears")
+
+        for stage, stats in result["stages"].items():
+            log(
+                f"    {stage:<15}{stats['per_second']:>12.0f}/s"
+                f"   p50 {stats['p50_ms']:7.3f}   p95 {stats['p95_ms']:7.3f}"
+                f"   p99 {stats['p99_ms']:7.3f} ms"
+            )
+
+    return {"matcher": matcher, "build_ms": build * 1000, "categories": results}
+
+
+# Everyday chat with no swearing in it, heavy on words that sound like some
+CLEAN_CHAT = (
+    "her brother said they were going to the game when it was over",
+    "what were you doing last night, your mom called twice",
+    "have you been well? i will fix the food later",
+    "that was a great match, well played everyone",
+    "the duck in the park ate all the bread again",
+    "i need to count the boxes before the truck gets here",
+    "we passed the tests and got our results back today",
+    "this fake plant looks better than the real one",
+    "bigger is not always better when you buy a phone",
+    "what time does the store close on sunday",
+    "she thinks the class starts at nine but it starts at ten",
+    "grab a batch of cookies and a glass of milk",
+)
+
+
+def bench_false_positives(badwords, corpus):
+    """Swears found in text that has none, per matcher and stage."""
+    pipeline = load("pipeline")
+    detector = pipeline.Detector(badwords)
+
+    messages = list(corpus["clean"]) + list(CLEAN_CHAT)
+    results = {}
+
+    log(f"false positives ({len(messages)} clean messages)")
+
+    for matcher, stages in pipeline.MATCHER_STAGES.items():
+        by_stage = Counter()
+        examples = Counter()
+        flagged = 0
+
+        for message in messages:
+            text = message.lower().strip()
+            spans = detector.detect(text, stages)
+
+            flagged += bool(spans)
+
+            for span in spans:
+                by_stage[span.stage] += 1
+                examples[f"{text[span.start:span.end]}->{span.term}"] += 1
+
+        results[matcher] = {
+            "flagged_messages": flagged,
+            "spans": sum(by_stage.values()),
+            "by_stage": dict(by_stage),
+            "examples": [example for example, _ in examples.most_common(10)],
+        }
+
+        log(
+            f"  {matcher:<11}{flagged:>5} of {len(messages)} flagged"
+            f"   {dict(by_stage) or 'none'}"
+        )
+
+        if examples:
+            log(f"    {', '.join(example for example, _ in examples.most_common(6))}")
+
+    return {"messages": len(messages), "matchers": results}
+
+
+# ----------------------------
+# Legacy comparisons
+# ----------------------------
+
+def legacy_exact(badwords, text):
+    count = 0
+
+    for word in badwords:
+        count += len(re.findall(rf"\b{re.escape(word)}\b", text))
+
+    return count
+
+
+def legacy_regex(badwords, text):
+    count = 0
+
+    for word in badwords:
+        pattern = word.replace("i", "[i1!]").replace("o", "[o0]").replace("a", "[a@]")
+        count += len(re.findall(pattern, text))
+
+    return count
+
+
+def legacy_fuzzy(badwords, text):
+    from rapidfuzz import fuzz
+
+    matches = 0
+
+    for w in text.split():
+        for bad in badwords:
+            if fuzz.ratio(w, bad) > 85:
+                matches += 1
+
+    return matches
+
+
+def compare(name, corpus, legacy, new, check=True):
+    legacy_time, legacy_results = timed(legacy, corpus)
+    new_time, new_results = timed(new, corpus)
+
+    result = {
+        "messages": len(corpus),
+        "legacy_per_second": len(corpus) / legacy_time,
+        "new_per_second": len(corpus) / new_time,
+        "speedup": legacy_time / new_time,
+    }
+
+    log(f"{name} ({len(corpus)} messages)")
+    log(f"  legacy:        {result['legacy_per_second']:12.1f} msg/s")
+    log(f"  current:       {result['new_per_second']:12.1f} msg/s")
+    log(f"  speedup:       {result['speedup']:12.1f}x")
+
+    if check:
+        result["mismatches"] = sum(a != b for a, b in zip(legacy_results, new_results))
+        log(f"  mismatches:    {result['mismatches']:12}")
+
+    return result
+
+
+def bench_legacy(badwords, corpus):
+    automaton = load("automaton")
+    normalize = load("normalize")
+    fuzzy = load("fuzzy")
+
+    # The old loops manage about ten short messages a second
+    short = corpus["profane"][:100]
+    long = corpus["long"][:5]
+
+    exact = automaton.WordAutomaton(badwords)
+    folded = normalize.FoldedMatcher(badwords)
+    index = fuzzy.FuzzyIndex(badwords, threshold=85)
+
+    return {
+        "exact": compare(
+            "exact matching", short, lambda t: legacy_exact(badwords, t), exact.count
+        ),
+        # Folding catches more than the old character classes, so only time it
+        "regex": compare(
+            "folded matching", short, lambda t: legacy_regex(badwords, t), folded.count, check=False
+        ),
+        "fuzzy": compare(
+            "fuzzy matching, long pastes", long, lambda t: legacy_fuzzy(badwords, t), index.count
+        ),
+    }
+
+
+# ----------------------------
+# Compiled word list
+# ----------------------------
+
+def bench_artifact(badwords):
+    artifact = load("artifact")
+
+    path = Path(tempfile.mkdtemp()) / "badwords.cache"
+
+    start = time.perf_counter()
+    artifact.load_detector(badwords, path)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, cached = artifact.load_detector(badwords, path)
+    warm = time.perf_counter() - start
+
+    log("compiled word list")
+    log(f"  cold (build + write): {cold * 1000:8.1f} ms")
+    log(f"  warm (cache file):    {warm * 1000:8.1f} ms{'' if cached else ' (cache miss!)'}")
+    log(f"  cache file:           {path.stat().st_size / 1024:8.0f} KiB")
+
+    return {
+        "cold_ms": cold * 1000,
+        "warm_ms": warm * 1000,
+        "warm_hit": cached,
+        "bytes": path.stat().st_size,
+    }
+
+
+# ----------------------------
+# Guild settings
+# ----------------------------
+
+def bench_settings(messages=20000):
+    try:
+        from redbot.core import Config, data_manager
+    except ImportError:
+        log("settings lookup: skipped, Red is not installed")
+        return None
+
+    # Red's JSON driver in a throwaway data directory
+    data_manager.basic_config = dict(data_manager.basic_config_default)
+    data_manager.basic_config["DATA_PATH"] = tempfile.mkdtemp()
+    data_manager.basic_config["STORAGE_TYPE"] = "JSON"
+    data_manager.basic_config["STORAGE_DETAILS"] = {}
+
+    config = Config.get_conf(None, identifier=92837423, cog_name="SwearJarBench")
+    config.register_guild(
+        enabled=True, jar_balance=0, fine_amount=10, cooldown=10,
+        jackpot_threshold=10000, jackpot_mode="uniform", matcher="fuzzy",
+        custom_words=[], allowed_words=[]
+    )
+
+    cache = load("settings").SettingsCache(config)
+    guild = types.SimpleNamespace(id=1)
+
+    async def legacy():
+        for _ in range(messages):
+            if await config.guild(guild).enabled():
+                await config.guild(guild).matcher()
+
+    async def snapshot():
+        for _ in range(messages):
+            settings = await cache.get(guild)
+            if settings.enabled:
+                settings.matcher
+
+    def run(coro):
+        start = time.perf_counter()
+        asyncio.run(coro())
+        return time.perf_counter() - start
+
+    legacy_time = run(legacy)
+    new_time = run(snapshot)
+
+    log(f"settings lookup per clean message ({messages} messages)")
+    log(f"  Config reads:  {messages / legacy_time:12.1f} msg/s")
+    log(f"  snapshot:      {messages / new_time:12.1f} msg/s")
+    log(f"  speedup:       {legacy_time / new_time:12.1f}x")
+
+    return {
+        "config_per_second": messages / legacy_time,
+        "snapshot_per_second": messages / new_time,
+        "speedup": legacy_time / new_time,
+    }
+
+
+# ----------------------------
+# Jackpot draw
+# ----------------------------
+
+def bench_jackpot(members=100000, draws=1000):
+    index = load("members")
+
+    people = [
+        types.SimpleNamespace(id=i, bot=i % 50 == 0, pending=False) for i in range(members)
+    ]
+    by_id = {m.id: m for m in people}
+    guild = types.SimpleNamespace(id=1, members=people, get_member=by_id.get)
+
+    def legacy():
+        eligible = [m for m in guild.members if not m.bot]
+        return eligible[int(time.time()) % len(eligible)]
+
+    start = time.perf_counter()
+    for _ in range(draws):
+        legacy()
+    legacy_time = (time.perf_counter() - start) / draws
+
+    pool = index.EligibleMembers()
+
+    start = time.perf_counter()
+    pool.index(guild)
+    build = time.perf_counter() - start
+
+    for i in range(members):
+        pool.seen(guild.id, i % 500)
+
+    timings = {}
+
+    for mode in index.JACKPOT_MODES:
+        start = time.perf_counter()
+        for _ in range(draws):
+            pool.pick(guild, mode)
+        timings[mode] = (time.perf_counter() - start) / draws
+
+    log(f"jackpot draw ({members} members)")
+    log(f"  member list scan:     {legacy_time * 1e6:10.1f} us")
+    log(f"  index build (once):   {build * 1e6:10.1f} us")
+
+    for mode, seconds in timings.items():
+        log(f"  indexed, {mode + ':':<12} {seconds * 1e6:10.1f} us")
+
+    return {
+        "members": members,
+        "scan_us": legacy_time * 1e6,
+        "build_us": build * 1e6,
+        **{f"{mode}_us": seconds * 1e6 for mode, seconds in timings.items()},
+    }
+
+
+# ----------------------------
+# Fine settlement
+# ----------------------------
+
+class FakeBank:
+    """In-memory stand-in for Red's bank with a fixed delay per call.
+
+    Calls go through one lock, like Red's Config driver serializing access
+    to its backing store. Like Red's, ``withdraw_credits`` refuses to
+    overdraw.
+    """
+
+    def __init__(self, balances, latency=0.001):
+        self.balances = dict(balances)
+        self.latency = latency
+        self.lock = asyncio.Lock()
+        self.calls = 0
+
+    async def get_balance(self, member):
+        async with self.lock:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+            return self.balances[member.id]
+
+    async def withdraw_credits(self, member, amount):
+        async with self.lock:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+
+            if amount > self.balances[member.id]:
+                raise ValueError("Insufficient funds")
+
+            self.balances[member.id] -= amount
+
+
+class FakeJars:
+    def guild_from_id(self, guild_id):
+        async def jar_balance():
+            return 0
+
+        return types.SimpleNamespace(jar_balance=jar_balance)
+
+
+def bench_ledger(fines=2000, members=200, balance=60, amount=10):
+    """Concurrent fines through the old per-fine flow and through the ledger."""
+    counters = load("counters")
+    ledger = load("ledger")
+
+    guild = types.SimpleNamespace(id=1)
+    people = [types.SimpleNamespace(id=i, guild=guild) for i in range(members)]
+
+    rng = random.Random(1234)
+    order = [rng.choice(people) for _ in range(fines)]
+
+    # Members can't cover every fine, so short balances are exercised too
+    expected = sum(min(balance, amount * order.count(p)) for p in people)
+
+    async def legacy(bank, store):
+        async def violation(member):
+            balance = await bank.get_balance(member)
+            total = min(balance, amount)
+
+            if total > 0:
+                await bank.withdraw_credits(member, total)
+                await store.add_to_jar(guild.id, total)
+
+        return await asyncio.gather(*[violation(m) for m in order], return_exceptions=True)
+
+    async def settled(bank, store):
+        book = ledger.SettlementLedger(bank, store)
+        return await asyncio.gather(*[book.charge(m, amount) for m in order], return_exceptions=True)
+
+    results = {}
+
+    log(f"fine settlement ({fines} concurrent fines, {members} members, 1 ms per bank call)")
+
+    for name, flow in (("per fine", legacy), ("ledger", settled)):
+        # Made inside the running loop: before 3.10 asyncio.Lock binds to one
+        bank = None
+
+        async def run():
+            nonlocal bank
+            bank = FakeBank({p.id: balance for p in people})
+            return await flow(bank, store)
+
+        store = counters.CounterStore(types.SimpleNamespace(guild_from_id=FakeJars().guild_from_id))
+
+        start = time.perf_counter()
+        outcomes = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+        withdrawn = len(people) * balance - sum(bank.balances.values())
+
+        results[name] = result = {
+            "fines_per_second": fines / elapsed,
+            "bank_calls": bank.calls,
+            "errors": sum(isinstance(o, Exception) for o in outcomes),
+            "withdrawn": withdrawn,
+            "jar": store.jars.get(guild.id, 0),
+            "expected": expected,
+            "overdrawn": sum(b < 0 for b in bank.balances.values()),
+        }
+
+        correct = result["withdrawn"] == result["jar"] == expected and not result["errors"]
+
+        log(
+            f"  {name:<9} {result['fines_per_second']:9.0f} fines/s   {bank.calls:6} bank calls"
+            f"   {result['errors']} errors   {'correct' if correct else 'WRONG'}"
+            f" (taken {withdrawn}, jar {result['jar']}, expected {expected})"
+        )
+
+    return results
+
+
+# ----------------------------
+# Transcription
+# ----------------------------
+
+def synthetic_speech(seconds, seed=1234, sample_rate=16000):
+    """Voice-like bursts separated by quiet room noise."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+
+    while total < seconds * sample_rate:
+        parts.append(rng.normal(0, 0.001, int(sample_rate * rng.uniform(0.5, 5))))
+
+        t = np.arange(int(sample_rate * rng.uniform(1, 8))) / sample_rate
+        parts.append(0.3 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t)))
+
+        total += len(parts[-2]) + len(parts[-1])
+
+    return np.concatenate(parts)[:seconds * sample_rate].astype(np.float32)
+
+
+def bench_vad(seconds=300, runs=20):
+    try:
+        audio = synthetic_speech(seconds)
+    except ImportError:
+        log("silence trimming: skipped, numpy is not installed")
+        return None
+
+    speech_chunks = load("audio").speech_chunks
+
+    samples = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        chunks = speech_chunks(audio)
+        samples.append(time.perf_counter() - start)
+
+    kept = sum(len(chunk) for chunk in chunks) / len(audio)
+    latency = summarize(samples)
+
+    log(f"silence trimming ({seconds} s synthetic clip)")
+    log(f"  p50 {latency['p50_ms']:.1f} ms, {len(chunks)} chunks, {kept:.0%} of the audio kept")
+
+    return {"seconds": seconds, "chunks": len(chunks), "kept": kept, "latency": latency}
+
+
+def get_backend(name, model_size, what):
+    backends = load("backends")
+
+    if not backends.installed(name):
+        log(f"{what}: skipped, {backends.BACKENDS[name].package} is not installed")
+        return None
+
+    return backends.get_backend(name, model_size)
+
+
+def transcribe_chunked(backend, clips, workers, stop=None):
+    """Wall-clock seconds per clip for silence-trimmed, pooled transcription."""
+    import numpy as np
+
+    audio = load("audio")
+    transcription = load("transcription")
+
+    async def run():
+        pool = transcription.TranscriptionPool(
+            backend.load,
+            backend.transcribe,
+            workers=workers,
+            queue_size=100,
+        )
+        pool.start()
+
+        # One throwaway job per worker so model loads aren't timed
+        await pool.map([np.zeros(audio.SAMPLE_RATE, np.float32)] * workers)
+
+        times = []
+
+        for clip in clips:
+            start = time.perf_counter()
+            await pool.map(audio.speech_chunks(clip), stop)
+            times.append(time.perf_counter() - start)
+
+        await pool.close()
+
+        return times
+
+    return asyncio.run(run())
+
+
+def bench_batching(model_size="base", sizes=(1, 2, 4, 8), clips=16, seconds=8):
+    """Clips per second through one worker at different batch sizes."""
+    import numpy as np
+
+    # The only backend that batches across clips
+    backend = get_backend("whisper", model_size, "batched transcription")
+
+    if backend is None:
+        return None
+
+    transcription = load("transcription")
+
+    audio = [synthetic_speech(seconds, seed=i) for i in range(clips)]
+    model = backend.load()
+
+    async def run(size):
+        pool = transcription.TranscriptionPool(
+            lambda: model,
+            backend.transcribe,
+            queue_size=clips,
+            run_batch=backend.transcribe_batch,
+            batch_size=size,
+        )
+        pool.start()
+
+        await pool.submit(np.zeros(16000, np.float32))
+
+        # Everything arrives at once, as in a burst of voice notes
+        start = time.perf_counter()
+        await asyncio.gather(*[pool.submit(clip) for clip in audio])
+        elapsed = time.perf_counter() - start
+
+        await pool.close()
+
+        return elapsed
+
+    results = {}
+
+    log(f"batched transcription ({model_size}, {clips} clips of {seconds} s, one worker)")
+
+    for size in sizes:
+        elapsed = asyncio.run(run(size))
+        results[size] = {"seconds": elapsed, "clips_per_second": clips / elapsed}
+        log(f"  batch {size:<3} {clips / elapsed:8.2f} clips/s")
+
+    return {"model": model_size, "clips": clips, "clip_seconds": seconds, "sizes": results}
+
+
+def load_fixtures(directory):
+    """Decoded audio fixtures, with reference transcripts where there are any.
+
+    A reference transcript for ``clip.ogg`` is read from ``clip.txt``.
+    """
+    decode = load("audio").decode
+
+    fixtures = []
+
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in AUDIO_SUFFIXES:
+            continue
+
+        start = time.perf_counter()
+        audio = decode(path.read_bytes())
+        decoded = time.perf_counter() - start
+
+        reference = path.with_suffix(".txt")
+        reference = reference.read_text(encoding="utf-8") if reference.exists() else None
+
+        fixtures.append((path.name, audio, reference, decoded))
+
+    return fixtures
+
+
+def rss():
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    return psutil.Process().memory_info().rss
+
+
+def run_backend(backend, fixtures, detector):
+    """Load ``backend`` and transcribe every fixture with it once."""
+    import gc
+
+    gc.collect()
+    before = rss()
+
+    start = time.perf_counter()
+    model = backend.load()
+    load_time = time.perf_counter() - start
+
+    after = rss()
+
+    samples = []
+    clips = {}
+    expected = found = false_positives = 0
+
+    for name, audio, reference, _ in fixtures:
+        start = time.perf_counter()
+        text = backend.transcribe(model, audio).strip()
+        samples.append(time.perf_counter() - start)
+
+        swears = len(detector.detect(text.lower()))
+
+        clips[name] = {"duration": len(audio) / 16000, "seconds": samples[-1], "swears": swears, "transcript": text}
+
+        if reference is not None:
+            wanted = len(detector.detect(reference.lower().strip()))
+            clips[name]["expected"] = wanted
+
+            expected += wanted
+            found += min(swears, wanted)
+            false_positives += max(0, swears - wanted)
+
+    del model
+    gc.collect()
+
+    return {
+        "load_s": load_time,
+        "model_mb": (after - before) / 1024 / 1024 if before is not None else None,
+        "latency": summarize(samples),
+        "swear_recall": found / expected if expected else None,
+        "false_positives": false_positives,
+        "clips": clips,
+    }
+
+
+def bench_audio(badwords, directory, backend_name="whisper", model_size="base", workers=2, long_clip=60):
+    backend = get_backend(backend_name, model_size, "transcription")
+
+    if backend is None:
+        return None
+
+    fixtures = load_fixtures(directory)
+
+    if not fixtures:
+        log(f"transcription: skipped, no audio files in {directory}")
+        return None
+
+    detector = load("pipeline").Detector(badwords)
+
+    result = run_backend(backend, fixtures, detector)
+    decoding = summarize([decoded for *_, decoded in fixtures])
+
+    # Whole clip on one model against trimmed chunks across the pool
+    long = [(name, audio) for name, audio, *_ in fixtures if len(audio) >= long_clip * 16000]
+    chunked = None
+
+    if long:
+        def found(text):
+            return bool(detector.detect(text.lower().strip()))
+
+        parallel = transcribe_chunked(backend, [audio for _, audio in long], workers)
+        early = transcribe_chunked(backend, [audio for _, audio in long], workers, found)
+
+        chunked = {
+            name: {
+                "whole_s": result["clips"][name]["seconds"],
+                "chunked_s": parallel[i],
+                "early_exit_s": early[i],
+            }
+            for i, (name, _) in enumerate(long)
+        }
+
+    latency = result["latency"]
+
+    log(f"transcription ({backend.name} {model_size}, {len(fixtures)} clips, model load {result['load_s']:.1f} s)")
+    log(
+        f"  p50 {latency['p50_ms'] / 1000:.2f} s   p95 {latency['p95_ms'] / 1000:.2f} s"
+        f"   p99 {latency['p99_ms'] / 1000:.2f} s"
+    )
+    log(f"  in-memory decode p50 {decoding['p50_ms']:.1f} ms   p99 {decoding['p99_ms']:.1f} ms")
+
+    if chunked:
+        log(f"  clips over {long_clip} s, whole vs trimmed on {workers} workers vs early exit:")
+
+        for name, times in chunked.items():
+            log(
+                f"    {name}: {times['whole_s']:.1f} s / {times['chunked_s']:.1f} s"
+                f" / {times['early_exit_s']:.1f} s"
+            )
+
+    return {
+        "backend": backend.name,
+        "model": model_size,
+        "decode": decoding,
+        **result,
+        "chunked": chunked,
+    }
+
+
+def bench_backends(badwords, directory, model_size="base"):
+    """Every installed backend on the same fixtures: accuracy, latency, memory."""
+    fixtures = load_fixtures(directory)
+
+    if not fixtures:
+        log(f"backend comparison: skipped, no audio files in {directory}")
+        return None
+
+    detector = load("pipeline").Detector(badwords)
+    names = load("backends").BACKENDS
+
+    results = {}
+
+    log(f"backend comparison ({model_size}, {len(fixtures)} clips)")
+
+    for name in names:
+        backend = get_backend(name, model_size, f"  {name}")
+
+        if backend is None:
+            continue
+
+        result = results[name] = run_backend(backend, fixtures, detector)
+
+        recall = result["swear_recall"]
+        memory = result["model_mb"]
+
+        log(
+            f"  {name:<15} p50 {result['latency']['p50_ms'] / 1000:6.2f} s"
+            f"   p95 {result['latency']['p95_ms'] / 1000:6.2f} s"
+            f"   swears found {'n/a' if recall is None else f'{recall:.0%}'}"
+            f" ({result['false_positives']} extra)"
+            f"   model {'n/a' if memory is None else f'{memory:.0f} MB'}"
+        )
+
+    return results
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+
+def main(argv=None):
+    global out
+
+    parser = argparse.ArgumentParser(description="Offline SwearJar benchmarks.")
+    parser.add_argument("--size", type=int, default=200, help="messages per corpus category")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--matcher", choices=("fuzzy", "soundalike", "both"), default="both")
+    parser.add_argument("--legacy", action="store_true", help="also time the old per-word loops")
+    parser.add_argument("--audio", metavar="DIR", help="directory of audio fixtures to transcribe")
+    parser.add_argument("--model", default="base", help="whisper model size for --audio")
+    parser.add_argument(
+        "--backend", choices=("whisper", "faster-whisper"), default="whisper",
+        help="transcription backend for --audio"
+    )
+    parser.add_argument(
+        "--backends", action="store_true", help="compare every installed backend on the --audio fixtures"
+    )
+    parser.add_argument("--workers", type=int, default=2, help="transcription workers for --audio")
+    parser.add_argument("--batch", action="store_true", help="also time batched transcription")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if args.json == "-":
+        out = sys.stderr
+
+    badwords = load_badwords()
+    corpus = make_corpus(badwords, size=args.size, seed=args.seed)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "words": len(badwords),
+            "size": args.size,
+            "seed": args.seed,
+        },
+        "stages": bench_stages(badwords, corpus, args.matcher),
+        "false_positives": bench_false_positives(badwords, corpus),
+        "artifact": bench_artifact(badwords),
+        "settings": bench_settings(),
+        "jackpot": bench_jackpot(),
+        "ledger": bench_ledger(),
+        "vad": bench_vad(),
+    }
+
+    if args.legacy:
+        results["legacy"] = bench_legacy(badwords, corpus)
+
+    if args.audio:
+        results["audio"] = bench_audio(badwords, args.audio, args.backend, args.model, args.workers)
+
+    if args.audio and args.backends:
+        results["backends"] = bench_backends(badwords, args.audio, args.model)
+
+    if args.batch:
+        results["batching"] = bench_batching(args.model)
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
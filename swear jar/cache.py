@@ -0,0 +1,219 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Small least-recently-used mapping with hit/miss counters."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self.data.pop(key, default)
+
+    def clear(self):
+        self.data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self.data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+
+        if entry is None:
+            return default
+
+        expires, value = entry
+
+        if expires < time.monotonic():
+            del self.data[key]
+            self.hits -= 1
+            self.misses += 1
+            return default
+
+        return value
+
+    def put(self, key, value):
+        now = time.monotonic()
+
+        super().put(key, (now + self.ttl, value))
+
+        # Stale entries collect at the front, so trimming them is cheap
+        while self.data:
+            expires, _ = next(iter(self.data.values()))
+
+            if expires >= now:
+                break
+
+            self.data.popitem(last=False)
+
+
+class TranscriptCache:
+    """Transcripts keyed by attachment ID and by content hash.
+
+    An attachment ID hit means the clip was already transcribed (an edit of
+    the same message) and nothing needs downloading. A content hash hit
+    means the same audio was posted before, so only the download is paid.
+    With ``path`` set, transcripts are also written to disk and survive
+    restarts and memory evictions. The disk tier keeps at most
+    ``disk_maxsize`` files and drops the least recently used; recency is
+    the file's mtime, so it carries over a restart too.
+    """
+
+    def __init__(self, maxsize=512, path=None, disk_maxsize=10000):
+        self.by_id = LRUCache(maxsize)
+        self.by_hash = LRUCache(maxsize)
+        self.path = path
+        self.disk_maxsize = disk_maxsize
+        self.disk_hits = 0
+        self.disk_evictions = 0
+
+        # digest -> None, oldest first; built from the directory on first use
+        self.disk_index = None
+        self.disk_lock = threading.Lock()
+
+    def get_id(self, attachment_id):
+        return self.by_id.get(attachment_id)
+
+    async def get_hash(self, digest):
+        text = self.by_hash.get(digest)
+
+        if text is not None or self.path is None:
+            return text
+
+        text = await asyncio.to_thread(self._read, digest)
+
+        if text is not None:
+            self.disk_hits += 1
+            self.by_hash.put(digest, text)
+
+        return text
+
+    async def put(self, attachment_id, digest, text):
+        self.by_id.put(attachment_id, text)
+        self.by_hash.put(digest, text)
+
+        if self.path is not None:
+            await asyncio.to_thread(self._write, digest, text)
+
+    def _file(self, digest):
+        return self.path / digest[:2] / f"{digest}.txt"
+
+    def _index(self):
+        if self.disk_index is None:
+            files = []
+
+            for file in self.path.glob("*/*.txt"):
+                try:
+                    files.append((file.stat().st_mtime, file.stem))
+                except FileNotFoundError:
+                    pass
+
+            self.disk_index = OrderedDict((digest, None) for _, digest in sorted(files))
+            self._evict()
+
+        return self.disk_index
+
+    def _evict(self):
+        while len(self.disk_index) > self.disk_maxsize:
+            digest, _ = self.disk_index.popitem(last=False)
+
+            try:
+                self._file(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+            self.disk_evictions += 1
+
+    def _read(self, digest):
+        with self.disk_lock:
+            index = self._index()
+
+            if digest not in index:
+                return None
+
+            file = self._file(digest)
+
+            try:
+                text = file.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                del index[digest]
+                return None
+
+            # The mtime is the recency a restart rebuilds the order from
+            index.move_to_end(digest)
+            os.utime(file)
+
+            return text
+
+    def _write(self, digest, text):
+        with self.disk_lock:
+            index = self._index()
+
+            file = self._file(digest)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(text, encoding="utf-8")
+
+            index[digest] = None
+            index.move_to_end(digest)
+            self._evict()
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_hash.clear()
+
+    def stats(self):
+        return {
+            "id": self.by_id.stats(),
+            "hash": self.by_hash.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_evictions": self.disk_evictions,
+            "disk_maxsize": self.disk_maxsize,
+            "disk": self.path is not None,
+        }
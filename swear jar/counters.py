@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+log = logging.getLogger("red.swearjar.counters")
+
+
+class CounterStore:
+    """Write-back layer for per-user counters and guild jar balances.
+
+    Cooldowns and swear counts live in memory and are written to Config in
+    one batch per flush instead of on every violation. Jar balances are
+    loaded once per guild and then only changed synchronously, so two
+    violations landing at the same time can't lose each other's increment.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+        self.last_trigger = {}
+        self.dirty_triggers = set()
+        self.swear_deltas = defaultdict(int)
+
+        self.jars = {}
+        self.dirty_jars = set()
+        self.jar_locks = defaultdict(asyncio.Lock)
+
+        self.flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.writes = 0
+
+    # ----------------------------
+    # Users
+    # ----------------------------
+
+    async def check_cooldown(self, user_id, cooldown, now=None):
+        """Start a cooldown for ``user_id`` unless one is still running."""
+        if user_id not in self.last_trigger:
+            # Read back once per user, so cooldowns survive a restart
+            last = await self.config.user_from_id(user_id).last_trigger()
+            self.last_trigger.setdefault(user_id, last)
+
+        now = time.time() if now is None else now
+
+        if now - self.last_trigger.get(user_id, 0) < cooldown:
+            return False
+
+        self.last_trigger[user_id] = now
+        self.dirty_triggers.add(user_id)
+
+        return True
+
+    def add_swears(self, user_id, count):
+        self.swear_deltas[user_id] += count
+
+    # ----------------------------
+    # Guild jars
+    # ----------------------------
+
+    async def jar(self, guild_id):
+        if guild_id not in self.jars:
+            async with self.jar_locks[guild_id]:
+                if guild_id not in self.jars:
+                    self.jars[guild_id] = await self.config.guild_from_id(guild_id).jar_balance()
+
+        return self.jars[guild_id]
+
+    async def add_to_jar(self, guild_id, amount):
+        await self.jar(guild_id)
+
+        self.jars[guild_id] += amount
+        self.dirty_jars.add(guild_id)
+
+        return self.jars[guild_id]
+
+    async def empty_jar(self, guild_id):
+        """Zero the jar and return what was in it."""
+        amount = await self.jar(guild_id)
+
+        self.jars[guild_id] = 0
+        self.dirty_jars.add(guild_id)
+
+        return amount
+
+    # ----------------------------
+    # Flushing
+    # ----------------------------
+
+    async def flush(self):
+        async with self.flush_lock:
+
+            triggers, self.dirty_triggers = self.dirty_triggers, set()
+            deltas, self.swear_deltas = self.swear_deltas, defaultdict(int)
+            jars, self.dirty_jars = self.dirty_jars, set()
+
+            try:
+                for user_id in triggers:
+                    await self.config.user_from_id(user_id).last_trigger.set(
+                        self.last_trigger[user_id]
+                    )
+                    self.writes += 1
+
+                for user_id, delta in list(deltas.items()):
+                    group = self.config.user_from_id(user_id)
+                    await group.swear_count.set(await group.swear_count() + delta)
+                    del deltas[user_id]
+                    self.writes += 1
+
+                for guild_id in jars:
+                    await self.config.guild_from_id(guild_id).jar_balance.set(self.jars[guild_id])
+                    self.writes += 1
+            except BaseException:
+                # Keep whatever didn't make it for the next flush, also when
+                # the flush is cancelled halfway through a write
+                self.dirty_triggers |= triggers
+                self.dirty_jars |= jars
+                for user_id, delta in deltas.items():
+                    self.swear_deltas[user_id] += delta
+                raise
+
+            self.flushes += 1
+
+    async def run(self, interval=30):
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Saving swear counters failed, retrying next flush")
@@ -0,0 +1,148 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+def qgrams(text, q=2):
+    return Counter(text[i:i + q] for i in range(len(text) - q + 1))
+
+
+class FuzzyIndex:
+    """Candidate index for ``fuzz.ratio(token, word) > threshold`` lookups.
+
+    ``fuzz.ratio`` is the normalized indel similarity, so a score above the
+    threshold bounds the indel distance by the combined length. That gives
+    a window of possible word lengths for every token, and through the
+    q-gram lemma a minimum number of shared bigrams. Only words passing
+    both filters are scored, in a single ``cdist`` call per message. The
+    filters never drop a true match, so results equal the brute-force scan.
+    """
+
+    def __init__(self, words, threshold=85, q=2):
+        self.words = list(words)
+        self.threshold = threshold
+        self.q = q
+
+        self.by_length = defaultdict(list)
+        self.postings = defaultdict(list)
+
+        for index, word in enumerate(self.words):
+            self.by_length[len(word)].append(index)
+
+            for gram, n in qgrams(word, q).items():
+                self.postings[len(word), gram].append((index, n))
+
+        self.max_length = max(self.by_length, default=0)
+        self._distances = {}
+
+    def max_distance(self, a, b):
+        """Largest indel distance that can still score above the threshold."""
+        key = (a, b)
+
+        if key not in self._distances:
+            total = a + b
+            distance = 0
+
+            # Slightly loose on purpose: a spare candidate only costs a score
+            while 100 * (1 - (distance + 1) / total) > self.threshold - 1e-6:
+                distance += 1
+
+            self._distances[key] = distance
+
+        return self._distances[key]
+
+    def candidates(self, token):
+        size = len(token)
+        grams = qgrams(token, self.q)
+        found = set()
+
+        for length in range(1, self.max_length + 1):
+
+            if length not in self.by_length:
+                continue
+
+            distance = self.max_distance(size, length)
+
+            if abs(size - length) > distance:
+                continue
+
+            need = max(size, length) - self.q + 1 - self.q * distance
+
+            if need <= 0:
+                found.update(self.by_length[length])
+                continue
+
+            shared = Counter()
+
+            for gram, n in grams.items():
+                for index, m in self.postings.get((length, gram), ()):
+                    shared[index] += min(n, m)
+
+            found.update(index for index, c in shared.items() if c >= need)
+
+        return found
+
+    def score(self, unique):
+        """Score distinct tokens against the union of their candidates.
+
+        Returns the score matrix and the word index of each column.
+        """
+        pool = set()
+
+        for token in unique:
+            pool.update(self.candidates(token))
+
+        pool = sorted(pool)
+
+        if not pool:
+            return None, pool
+
+        scores = process.cdist(
+            unique,
+            [self.words[i] for i in pool],
+            scorer=fuzz.ratio,
+            dtype=np.float64,
+        )
+
+        return scores, pool
+
+    def best_matches(self, tokens):
+        """Map each distinct token to its best word above the threshold."""
+        unique = list(dict.fromkeys(tokens))
+        scores, pool = self.score(unique)
+
+        if scores is None:
+            return {}
+
+        cols = scores.argmax(axis=1)
+        best = scores[np.arange(len(unique)), cols]
+
+        return {
+            unique[row]: self.words[pool[cols[row]]]
+            for row in np.nonzero(best > self.threshold)[0]
+        }
+
+    def matches(self, tokens):
+        """Return ``(token, word)`` for every pair scoring above the threshold.
+
+        Repeated tokens produce repeated pairs, like the per-token scan did.
+        """
+        counts = Counter(tokens)
+        unique = list(counts)
+
+        scores, pool = self.score(unique)
+
+        if scores is None:
+            return []
+
+        result = []
+
+        for row, col in zip(*np.nonzero(scores > self.threshold)):
+            token = unique[row]
+            result.extend([(token, self.words[pool[col]])] * counts[token])
+
+        return result
+
+    def count(self, text):
+        return len(self.matches(text.split()))
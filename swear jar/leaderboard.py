@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+log = logging.getLogger("red.swearjar.leaderboard")
+
+DAYS = 30
+
+SPARKS = "▁▂▃▄▅▆▇█"
+
+
+def today(now=None):
+    return int((time.time() if now is None else now) // 86400)
+
+
+def sparkline(values):
+    peak = max(values, default=0)
+
+    if not peak:
+        return SPARKS[0] * len(values)
+
+    # Rounded up, so any swear at all shows above an empty day
+    return "".join(SPARKS[-(-value * (len(SPARKS) - 1) // peak)] for value in values)
+
+
+class DailyCounts:
+    """Ring buffer of one user's swears over the last ``DAYS`` days.
+
+    Day ``d`` lives in slot ``d % DAYS``. Slots for days that passed without
+    a swear are zeroed lazily, when the next swear moves ``last_day`` on.
+    """
+
+    __slots__ = ("counts", "last_day")
+
+    def __init__(self, counts=None, last_day=0):
+        self.counts = array("I", counts or [0] * DAYS)
+        self.last_day = last_day
+
+    def add(self, day, count):
+        if day > self.last_day:
+            if day - self.last_day >= DAYS:
+                self.counts = array("I", [0] * DAYS)
+            else:
+                for skipped in range(self.last_day + 1, day + 1):
+                    self.counts[skipped % DAYS] = 0
+
+            self.last_day = day
+
+        elif day <= self.last_day - DAYS:
+            return
+
+        self.counts[day % DAYS] += count
+
+    def series(self, day):
+        """Counts for the ``DAYS`` days up to and including ``day``, oldest first."""
+        return [
+            self.counts[d % DAYS] if self.last_day - DAYS < d <= self.last_day else 0
+            for d in range(day - DAYS + 1, day + 1)
+        ]
+
+
+class Leaderboard:
+    """One guild's swear totals, kept ranked as they change.
+
+    ``ranking`` is a sorted list of ``(-total, user_id)``. An update is two
+    binary searches plus a list shift, and the top N is a slice, so nothing
+    ever scans every member's record.
+    """
+
+    def __init__(self, data=None):
+        self.totals = {}
+        self.ranking = []
+        self.daily = {}
+
+        for user_id, (total, last_day, counts) in (data or {}).items():
+            user_id = int(user_id)
+            self.totals[user_id] = total
+            self.daily[user_id] = DailyCounts(counts, last_day)
+
+        self.ranking = sorted((-total, user_id) for user_id, total in self.totals.items())
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def add(self, user_id, count, day):
+        old = self.totals.get(user_id)
+
+        if old is not None:
+            del self.ranking[bisect_left(self.ranking, (-old, user_id))]
+
+        total = self.totals[user_id] = (old or 0) + count
+        insort(self.ranking, (-total, user_id))
+
+        if user_id not in self.daily:
+            self.daily[user_id] = DailyCounts()
+
+        self.daily[user_id].add(day, count)
+
+    def top(self, n=10):
+        return [(user_id, -total) for total, user_id in self.ranking[:n]]
+
+    def rank(self, user_id):
+        """1-based position of ``user_id``, or None if they never swore here."""
+        total = self.totals.get(user_id)
+
+        if total is None:
+            return None
+
+        return bisect_left(self.ranking, (-total, user_id)) + 1
+
+    def stats(self, user_id, day):
+        daily = self.daily.get(user_id)
+
+        return {
+            "total": self.totals.get(user_id, 0),
+            "rank": self.rank(user_id),
+            "members": len(self.ranking),
+            "daily": daily.series(day) if daily else [0] * DAYS,
+        }
+
+    def dump(self):
+        return {
+            str(user_id): [total, self.daily[user_id].last_day, self.daily[user_id].counts.tolist()]
+            for user_id, total in self.totals.items()
+        }
+
+
+class LeaderboardStore:
+    """Leaderboards for every guild, loaded once and written back in bulk.
+
+    Each guild's board is stored as a single Config value, so a flush is
+    one write per guild that changed, however many members swore.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+        self.boards = {}
+        self.dirty = set()
+        self.locks = defaultdict(asyncio.Lock)
+
+        self.flush_lock = asyncio.Lock()
+        self.writes = 0
+
+    def group(self, guild_id):
+        return self.config.custom("LEADERBOARD", str(guild_id))
+
+    async def board(self, guild_id):
+        if guild_id not in self.boards:
+            async with self.locks[guild_id]:
+                if guild_id not in self.boards:
+                    self.boards[guild_id] = Leaderboard(await self.group(guild_id).users())
+
+        return self.boards[guild_id]
+
+    async def add(self, guild_id, user_id, count, now=None):
+        board = await self.board(guild_id)
+
+        board.add(user_id, count, today(now))
+        self.dirty.add(guild_id)
+
+    async def flush(self):
+        async with self.flush_lock:
+
+            dirty, self.dirty = self.dirty, set()
+
+            try:
+                for guild_id in list(dirty):
+                    await self.group(guild_id).users.set(self.boards[guild_id].dump())
+                    dirty.discard(guild_id)
+                    self.writes += 1
+            except BaseException:
+                # Cancelled mid-write too, so the final flush still has them
+                self.dirty |= dirty
+                raise
+
+    async def run(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Saving leaderboards failed, retrying next flush")
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from collections import defaultdict
+from itertools import count
+
+log = logging.getLogger("red.swearjar.ledger")
+
+
+class Fine:
+
+    __slots__ = ("id", "member", "amount", "attempts", "future")
+
+    def __init__(self, id, member, amount, future):
+        self.id = id
+        self.member = member
+        self.amount = amount
+        self.attempts = 0
+        self.future = future
+
+
+class SettlementLedger:
+    """Per-guild queue of fines, settled against the bank in batches.
+
+    ``charge`` records a fine and waits for it to settle. Fines pile up for
+    ``delay`` seconds (or until ``batch_size`` are waiting) and are then
+    settled together under the guild's lock: one balance read and one
+    withdrawal per member however many fines they ran up, and one jar
+    update per batch. Nothing else touches a guild's balances or jar while
+    its batch settles, so concurrent violations can't race each other.
+
+    A fine leaves the ledger only once its withdrawal went through, and a
+    failed withdrawal is retried up to ``retries`` times, so every fine is
+    charged exactly once. ``close`` settles whatever is still waiting and
+    returns what couldn't be settled, for the caller to persist.
+    """
+
+    def __init__(self, bank, counters, delay=0.05, batch_size=100, retries=3):
+        self.bank = bank
+        self.counters = counters
+        self.delay = delay
+        self.batch_size = batch_size
+        self.retries = retries
+
+        self.ids = count()
+        self.pending = defaultdict(list)
+        self.timers = {}
+        self.tasks = set()
+        self.locks = defaultdict(asyncio.Lock)
+
+        self.fines = 0
+        self.batches = 0
+        self.bank_calls = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def charge(self, member, amount):
+        """Fine ``member`` up to ``amount``; returns ``(charged, jar balance)``."""
+        # A zero or negative fine has nothing to take and must not shrink the jar
+        if amount <= 0:
+            return 0, await self.counters.jar(member.guild.id)
+
+        fine = Fine(next(self.ids), member, amount, asyncio.get_running_loop().create_future())
+
+        self.fines += 1
+        self.add(fine)
+
+        return await fine.future
+
+    def add(self, fine):
+        guild_id = fine.member.guild.id
+
+        self.pending[guild_id].append(fine)
+
+        if len(self.pending[guild_id]) >= self.batch_size:
+            self._spawn(self.settle(guild_id))
+        elif guild_id not in self.timers:
+            self.timers[guild_id] = self._spawn(self._settle_later(guild_id))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+        return task
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Settling fines failed", exc_info=task.exception())
+
+    async def _settle_later(self, guild_id):
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.timers.pop(guild_id, None)
+
+        await self.settle(guild_id)
+
+    async def settle(self, guild_id):
+        async with self.locks[guild_id]:
+
+            batch, self.pending[guild_id] = self.pending[guild_id], []
+
+            if not batch:
+                return
+
+            retry = []
+
+            # Loaded up front so the jar update after the withdrawals can't fail
+            try:
+                await self.counters.jar(guild_id)
+            except Exception as e:
+                # Nothing was taken yet, so the whole batch goes round again
+                self._retry_or_fail(batch, e, retry)
+                batch = []
+
+            by_member = defaultdict(list)
+
+            for fine in batch:
+                by_member[fine.member.id].append(fine)
+
+            settled = []
+
+            for fines in by_member.values():
+                member = fines[0].member
+                owed = sum(fine.amount for fine in fines)
+
+                try:
+                    balance = await self.bank.get_balance(member)
+                    self.bank_calls += 1
+
+                    charged = min(balance, owed)
+
+                    if charged > 0:
+                        await self.bank.withdraw_credits(member, charged)
+                        self.bank_calls += 1
+                except Exception as e:
+                    # Nothing was taken, so the fines can safely go round again
+                    self._retry_or_fail(fines, e, retry)
+                    continue
+
+                # Oldest fines are paid first when the balance runs short
+                for fine in fines:
+                    paid = min(fine.amount, charged)
+                    charged -= paid
+                    settled.append((fine, paid))
+
+            if settled:
+                jar = await self.counters.add_to_jar(guild_id, sum(paid for _, paid in settled))
+
+                self.batches += 1
+
+                for fine, paid in settled:
+                    if not fine.future.done():
+                        fine.future.set_result((paid, jar))
+
+        for fine in retry:
+            self.add(fine)
+
+    def _retry_or_fail(self, fines, error, retry):
+        for fine in fines:
+            fine.attempts += 1
+
+            if fine.attempts < self.retries:
+                retry.append(fine)
+                self.retried += 1
+            else:
+                self.failed += 1
+                if not fine.future.done():
+                    fine.future.set_exception(error)
+
+    def _cancel_timers(self):
+        for timer in self.timers.values():
+            timer.cancel()
+
+        self.timers.clear()
+
+    async def close(self):
+        """Settle everything waiting and return the fines that couldn't be."""
+        self._cancel_timers()
+
+        for guild_id in list(self.pending):
+            # Retries land back in pending, so keep going until it drains
+            for _ in range(self.retries):
+                if not self.pending[guild_id]:
+                    break
+
+                await self.settle(guild_id)
+
+                self._cancel_timers()
+
+        left = [fine for fines in self.pending.values() for fine in fines]
+        self.pending.clear()
+
+        for fine in left:
+            if not fine.future.done():
+                fine.future.cancel()
+
+        return left
+
+    def stats(self):
+        return {
+            "fines": self.fines,
+            "batches": self.batches,
+            "bank_calls": self.bank_calls,
+            "pending": sum(len(fines) for fines in self.pending.values()),
+            "retried": self.retried,
+            "failed": self.failed,
+        }
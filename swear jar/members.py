@@ -0,0 +1,157 @@
+import random
+
+JACKPOT_MODES = ("uniform", "active")
+
+
+def eligible(member):
+    """Whether a member can win the jackpot."""
+    return not member.bot and not member.pending
+
+
+class MemberIndex:
+    """Set of member IDs kept in a list, for O(1) add, remove and sampling.
+
+    ``positions`` maps an ID to its slot. Removing an ID moves the last one
+    into its slot, so the list never has holes.
+    """
+
+    __slots__ = ("ids", "positions")
+
+    def __init__(self, ids=()):
+        self.ids = list(dict.fromkeys(ids))
+        self.positions = {member_id: i for i, member_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, member_id):
+        return member_id in self.positions
+
+    def add(self, member_id):
+        if member_id not in self.positions:
+            self.positions[member_id] = len(self.ids)
+            self.ids.append(member_id)
+
+    def discard(self, member_id):
+        position = self.positions.pop(member_id, None)
+
+        if position is None:
+            return
+
+        last = self.ids.pop()
+
+        if position < len(self.ids):
+            self.ids[position] = last
+            self.positions[last] = position
+
+    def choice(self, rng):
+        return self.ids[rng.randrange(len(self.ids))] if self.ids else None
+
+
+class RecentAuthors:
+    """The authors of a guild's last ``size`` messages, in a ring.
+
+    Sampling a random slot picks a member with odds proportional to how
+    much they talked lately.
+    """
+
+    __slots__ = ("ids", "cursor")
+
+    def __init__(self, size=1000):
+        self.ids = [None] * size
+        self.cursor = 0
+
+    def add(self, member_id):
+        self.ids[self.cursor % len(self.ids)] = member_id
+        self.cursor += 1
+
+    def choice(self, rng):
+        filled = min(self.cursor, len(self.ids))
+        return self.ids[rng.randrange(filled)] if filled else None
+
+
+class EligibleMembers:
+    """Per-guild jackpot candidates, maintained from member events.
+
+    A guild's index is built from its member cache the first time it's
+    needed and kept current by join, leave and update events afterwards,
+    so drawing a winner never walks the member list.
+    """
+
+    def __init__(self, recent=1000, rng=None):
+        self.recent = recent
+        self.rng = rng or random.Random()
+
+        self.indexes = {}
+        self.authors = {}
+
+    def index(self, guild):
+        index = self.indexes.get(guild.id)
+
+        if index is None:
+            index = self.indexes[guild.id] = MemberIndex(m.id for m in guild.members if eligible(m))
+
+        return index
+
+    def update(self, member):
+        index = self.indexes.get(member.guild.id)
+
+        # Guilds without an index yet pick the change up when it's built
+        if index is None:
+            return
+
+        if eligible(member):
+            index.add(member.id)
+        else:
+            index.discard(member.id)
+
+    def remove(self, guild_id, member_id):
+        index = self.indexes.get(guild_id)
+
+        if index is not None:
+            index.discard(member_id)
+
+    def forget(self, guild_id):
+        self.indexes.pop(guild_id, None)
+        self.authors.pop(guild_id, None)
+
+    def seen(self, guild_id, member_id):
+        authors = self.authors.get(guild_id)
+
+        if authors is None:
+            authors = self.authors[guild_id] = RecentAuthors(self.recent)
+
+        authors.add(member_id)
+
+    def pick(self, guild, mode="uniform", attempts=10):
+        """Draw a winner, or None if nobody in the guild is eligible.
+
+        ``active`` weights members by their share of recent messages and
+        falls back to ``uniform`` when none of the recent authors can win.
+        """
+        index = self.index(guild)
+
+        for _ in range(attempts):
+            member_id = None
+
+            if mode == "active" and guild.id in self.authors:
+                member_id = self.authors[guild.id].choice(self.rng)
+
+                if member_id not in index:
+                    member_id = None
+
+            if member_id is None:
+                member_id = index.choice(self.rng)
+
+            if member_id is None:
+                return None
+
+            member = guild.get_member(member_id)
+
+            if member is not None:
+                return member
+
+            # Left without us hearing about it
+            index.discard(member_id)
+
+        return None
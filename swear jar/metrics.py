@@ -0,0 +1,179 @@
+import heapq
+import time
+from bisect import bisect_left
+from collections import deque, defaultdict
+from contextlib import nullcontext
+from typing import NamedTuple
+
+# Bucket upper bounds in seconds: 1µs to ~2 min, four buckets per doubling,
+# so a reported percentile is at most ~19% above the real one
+BOUNDS = tuple(1e-6 * 2 ** (i / 4) for i in range(108))
+
+NULL_STAGE = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cheap enough to update per message."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.buckets[bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the ``pct`` percentile."""
+        if not self.count:
+            return 0.0
+
+        rank = pct / 100 * self.count
+        seen = 0
+
+        for index, n in enumerate(self.buckets):
+            seen += n
+
+            if seen >= rank:
+                return min(BOUNDS[index], self.max) if index < len(BOUNDS) else self.max
+
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class SlowMessage(NamedTuple):
+    total: float
+    guild_id: int
+    channel_id: int
+    message_id: int
+    stage: str
+    stage_time: float
+    at: float
+
+
+class Trace:
+    """Stage timings of one message as it goes through ``process_message``.
+
+    Timings are wall clock, so a stage that awaits includes the time other
+    tasks held the event loop. That is what a user waiting on the bot sees.
+    """
+
+    __slots__ = ("guild_id", "channel_id", "message_id", "started", "stages")
+
+    def __init__(self, message):
+        self.guild_id = message.guild.id
+        self.channel_id = message.channel.id
+        self.message_id = message.id
+        self.started = time.perf_counter()
+        self.stages = defaultdict(float)
+
+    def timed(self, stage, func, *args):
+        start = time.perf_counter()
+
+        try:
+            return func(*args)
+        finally:
+            self.stages[stage] += time.perf_counter() - start
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+
+class StageTimer:
+
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.stages[self.name] += time.perf_counter() - self.start
+
+
+def stage(trace, name):
+    """Time a block against ``trace``, or do nothing when tracing is off."""
+    return NULL_STAGE if trace is None else StageTimer(trace, name)
+
+
+class Metrics:
+    """Per-stage latency histograms, globally and per guild.
+
+    When disabled, ``trace`` returns None and every instrumented call site
+    skips timing entirely, so the cost is one attribute check per message.
+    The last ``recent`` messages are kept to answer "what was slow lately".
+    """
+
+    def __init__(self, enabled=True, recent=500):
+        self.enabled = enabled
+        self.since = time.time()
+
+        self.stages = defaultdict(Histogram)
+        self.guilds = defaultdict(lambda: defaultdict(Histogram))
+        self.recent = deque(maxlen=recent)
+
+    def trace(self, message):
+        return Trace(message) if self.enabled else None
+
+    def record(self, trace):
+        total = time.perf_counter() - trace.started
+
+        guild = self.guilds[trace.guild_id]
+
+        for name, seconds in trace.stages.items():
+            self.stages[name].add(seconds)
+            guild[name].add(seconds)
+
+        self.stages["total"].add(total)
+        guild["total"].add(total)
+
+        if trace.stages:
+            dominant = max(trace.stages, key=trace.stages.get)
+            dominant_time = trace.stages[dominant]
+        else:
+            dominant, dominant_time = "none", 0.0
+
+        self.recent.append(SlowMessage(
+            total, trace.guild_id, trace.channel_id, trace.message_id,
+            dominant, dominant_time, time.time()
+        ))
+
+    def slowest(self, guild_id=None, n=5):
+        messages = self.recent
+
+        if guild_id is not None:
+            messages = [m for m in messages if m.guild_id == guild_id]
+
+        return heapq.nlargest(n, messages)
+
+    def summary(self, guild_id=None):
+        """Stage name -> summary dict, for one guild or for all of them."""
+        stages = self.stages if guild_id is None else self.guilds.get(guild_id, {})
+
+        return {name: histogram.summary() for name, histogram in stages.items()}
+
+    def reset(self):
+        self.since = time.time()
+        self.stages.clear()
+        self.guilds.clear()
+        self.recent.clear()
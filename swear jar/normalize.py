@@ -0,0 +1,210 @@
+import unicodedata
+from itertools import groupby
+
+from .automaton import WordAutomaton
+
+# Bump whenever the folding rules change so compiled word lists are rebuilt
+NORMALIZER_VERSION = 1
+
+LEET = {
+    "0": "o",
+    "1": "i",
+    "!": "i",
+    "|": "i",
+    "3": "e",
+    "4": "a",
+    "@": "a",
+    "5": "s",
+    "$": "s",
+    "6": "g",
+    "9": "g",
+    "7": "t",
+    "+": "t",
+    "8": "b",
+    "€": "e",
+}
+
+# Lowercase look-alikes that Unicode normalization leaves alone
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "з": "3", "и": "u", "і": "i",
+    "ї": "i", "ј": "j", "к": "k", "м": "m", "н": "h", "о": "o", "п": "n",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "ԁ": "d",
+    "һ": "h", "ԛ": "q", "ԝ": "w", "ь": "b",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin letters without a decomposition
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ħ": "h", "ŧ": "t", "ɡ": "g",
+    "ß": "ss", "æ": "ae", "œ": "oe",
+}
+
+ZERO_WIDTH = (
+    "\u00ad\u034f\u180e\u200b\u200c\u200d\u200e\u200f"
+    "\u2060\u2061\u2062\u2063\u2064\ufeff"
+)
+
+# Blocks whose compatibility decomposition is a plain ASCII letter or digit:
+# accented Latin, modifier letters, super/subscripts, enclosed and
+# fullwidth forms, mathematical alphanumerics.
+DECOMPOSABLE_RANGES = (
+    (0x00C0, 0x0250),
+    (0x1D2C, 0x1D6B),
+    (0x1E00, 0x1F00),
+    (0x2070, 0x20A0),
+    (0x2460, 0x2500),
+    (0xFF01, 0xFF5F),
+    (0x1D400, 0x1D800),
+    (0x1F130, 0x1F18A),
+)
+
+
+def _decompose(ch):
+    base = unicodedata.normalize("NFKD", ch)
+    base = "".join(c for c in base if not unicodedata.combining(c)).lower()
+
+    if base and base != ch and base.isascii() and len(base) <= 2:
+        return base
+
+    return None
+
+
+def _build_table():
+    table = {}
+
+    for start, stop in DECOMPOSABLE_RANGES:
+        for cp in range(start, stop):
+            base = _decompose(chr(cp))
+            if base is not None:
+                table[cp] = base
+
+    for cp in range(0x0300, 0x0370):
+        table[cp] = None
+
+    for ch in ZERO_WIDTH:
+        table[ord(ch)] = None
+
+    for src, dst in CONFUSABLES.items():
+        table[ord(src)] = dst
+
+    # Leet last, applied on top of whatever the character decomposed to
+    for cp, dst in list(table.items()):
+        if dst:
+            table[cp] = "".join(LEET.get(c, c) for c in dst)
+
+    for src, dst in LEET.items():
+        table[ord(src)] = dst
+
+    return table
+
+
+FOLD_TABLE = _build_table()
+
+
+def fold(text):
+    """Map leet, confusable and zero-width characters onto plain letters."""
+    return text.lower().translate(FOLD_TABLE)
+
+
+def squeeze(text):
+    """Collapse repeated characters, returning the text and its run lengths."""
+    chars = []
+    runs = []
+
+    for ch, group in groupby(text):
+        chars.append(ch)
+        runs.append(sum(1 for _ in group))
+
+    return "".join(chars), runs
+
+
+class FoldedMatcher:
+    """Substring matcher over the folded, squeezed form of a word list.
+
+    Both the words and the message are folded and squeezed the same way, so
+    ``sh1iiit`` and ``ѕhit`` land on the same key as ``shit``. A hit only
+    counts if every repeated letter of the word is repeated at least as
+    often in the message, which keeps ``as`` from matching ``ass``.
+    """
+
+    def __init__(self, words, min_length=3):
+        self.words = list(words)
+
+        keys = {}
+
+        for word in self.words:
+            folded = fold(word)
+
+            # Very short folds ("xx", "]") would match inside almost anything
+            if len(folded) < min_length or not any(c.isalpha() for c in folded):
+                continue
+
+            key, runs = squeeze(folded)
+            variants = keys.setdefault(key, {})
+
+            # Report leet spellings under their plain entry when there is one
+            if tuple(runs) not in variants or folded == word:
+                variants[tuple(runs)] = word
+
+        self.keys = list(keys)
+
+        # Most demanding run pattern first, so "fuuuck" reports as "fuuck"
+        self.variants = [
+            sorted(keys[key].items(), key=lambda item: sum(item[0]), reverse=True)
+            for key in self.keys
+        ]
+        self.automaton = WordAutomaton(self.keys, whole_word=False)
+
+    def _verify(self, runs, start, end, index):
+        for need, word in self.variants[index]:
+            if all(have >= n for have, n in zip(runs[start:end], need)):
+                return word
+
+        return None
+
+    def iter_matches(self, text):
+        """Yield ``(start, end, word)`` in squeezed-text coordinates."""
+        squeezed, runs = squeeze(fold(text))
+
+        for start, end, index in self.automaton.iter_matches(squeezed):
+            word = self._verify(runs, start, end, index)
+
+            if word is not None:
+                yield start, end, word
+
+    def iter_token_matches(self, tokens):
+        """Yield ``(first, last, start, end, word)`` for hits over ``tokens``.
+
+        Tokens are folded one by one and joined with single spaces, so a
+        phrase still matches across line breaks. ``first`` and ``last`` are
+        the indexes of the tokens a hit touches, ``start`` and ``end`` its
+        position in the squeezed text.
+        """
+        chars = []
+        runs = []
+        owners = []
+
+        for i, token in enumerate(tokens):
+
+            if i:
+                chars.append(" ")
+                runs.append(1)
+                owners.append(-1)
+
+            for ch in fold(token):
+                if owners and owners[-1] == i and chars[-1] == ch:
+                    runs[-1] += 1
+                else:
+                    chars.append(ch)
+                    runs.append(1)
+                    owners.append(i)
+
+        for start, end, index in self.automaton.iter_matches("".join(chars)):
+            word = self._verify(runs, start, end, index)
+
+            if word is not None:
+                touched = [owner for owner in owners[start:end] if owner >= 0]
+                yield touched[0], touched[-1], start, end, word
+
+    def count(self, text):
+        return sum(1 for _ in self.iter_matches(text))
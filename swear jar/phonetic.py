@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import jellyfish
+from rapidfuzz import fuzz
+
+from .normalize import fold
+
+COMMON_WORDS_PATH = Path(__file__).parent / "commonwords.txt"
+
+
+def load_common_words(path=COMMON_WORDS_PATH):
+    with open(path) as f:
+        return frozenset(w.strip().lower() for w in f if w.strip())
+
+
+# Inflections stripped when checking a token against the common words
+SUFFIXES = ("ing", "ed", "es", "er", "est", "ly", "s", "d")
+
+
+def letters_of(word):
+    return "".join(c for c in fold(word) if c.isalpha())
+
+
+def encode(word):
+    """Metaphone key of the folded, letters-only form of ``word``."""
+    letters = letters_of(word)
+
+    if not letters.isascii():
+        return ""
+
+    return jellyfish.metaphone(letters)
+
+
+class PhoneticIndex:
+    """Hash map from Metaphone key to the bad words that sound like it.
+
+    Looking a token up is one encode plus one dict access. Metaphone drops
+    most vowels, so a key hit is only accepted when the word starts with
+    the same letter and the spelling is close (``guard``). Everyday words
+    ("were", "when", "duck") sound like plenty of bad words, so tokens in
+    ``common`` are never looked up at all.
+    """
+
+    def __init__(self, words, min_length=3, guard=80, common=None):
+        self.min_length = min_length
+        self.guard = guard
+        self.common = load_common_words() if common is None else frozenset(common)
+        self.keys = {}
+
+        for word in words:
+
+            # Phrases are left to the exact and folded stages
+            if " " in word or len(word) < min_length:
+                continue
+
+            key = encode(word)
+
+            if len(key) >= 2:
+                self.keys.setdefault(key, []).append(word)
+
+    def lookup(self, token):
+        letters = letters_of(token)
+
+        if len(letters) < self.min_length or self.is_common(letters):
+            return None
+
+        best = None
+        best_score = self.guard
+
+        for word in self.keys.get(encode(token), ()):
+
+            if word[0] != letters[0]:
+                continue
+
+            score = fuzz.ratio(letters, word)
+
+            if score >= best_score:
+                best, best_score = word, score
+
+        return best
+
+    def is_common(self, letters):
+        """Whether ``letters`` is a common word or a plain inflection of one."""
+        if letters in self.common:
+            return True
+
+        for suffix in SUFFIXES:
+            if len(letters) > len(suffix) + 2 and letters.endswith(suffix):
+                stem = letters[:-len(suffix)]
+
+                # "bigger" -> "bigg" -> "big", "making" -> "mak" -> "make"
+                if stem in self.common or stem[:-1] in self.common and stem[-1] == stem[-2] \
+                        or stem + "e" in self.common:
+                    return True
+
+        return False
+
+    def matches(self, tokens):
+        """Return ``(token, word)`` for every token with a sound-alike hit."""
+        seen = {}
+        result = []
+
+        for token in tokens:
+
+            if token not in seen:
+                seen[token] = self.lookup(token)
+
+            if seen[token] is not None:
+                result.append((token, seen[token]))
+
+        return result
+
+    def count(self, text):
+        return len(self.matches(text.split()))
@@ -0,0 +1,255 @@
+import re
+from itertools import count
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from .automaton import WordAutomaton
+from .fuzzy import FuzzyIndex
+from .normalize import FoldedMatcher, fold
+from .phonetic import PhoneticIndex
+
+TOKEN = re.compile(r"\S+")
+
+# Messages mentioning any of these are talking about swearing, not swearing
+ALLOWED_CONTEXTS = (
+    "swear word list",
+    "example swear",
+    "dictionary",
+    "quote"
+)
+
+STAGE_ORDER = ("exact", "regex", "fuzzy", "soundalike")
+
+MATCHER_STAGES = {
+    "fuzzy": ("exact", "regex", "fuzzy"),
+    "soundalike": ("exact", "regex", "soundalike"),
+    "both": ("exact", "regex", "fuzzy", "soundalike"),
+}
+
+
+class Token(NamedTuple):
+    start: int
+    end: int
+    text: str
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    term: str
+    stage: str
+
+
+def context_filter(text):
+    """False when the text is exempt from detection."""
+    return not any(ctx in text for ctx in ALLOWED_CONTEXTS)
+
+
+def allow_key(text):
+    """Folded, letters-and-digits form an allowed word is compared by."""
+    return "".join(c for c in fold(text.strip(".,!?;:'\"()[]{}*_~")) if c.isalnum())
+
+
+def tokenize(text):
+    return [Token(m.start(), m.end(), m.group()) for m in TOKEN.finditer(text)]
+
+
+def non_overlapping(hits):
+    """Pick leftmost, then longest, non-overlapping ``(start, end, ...)`` hits."""
+    chosen = []
+    last_end = None
+
+    for hit in sorted(hits, key=lambda hit: (hit[0], hit[0] - hit[1])):
+        if last_end is None or hit[0] >= last_end:
+            chosen.append(hit)
+            last_end = hit[1]
+
+    return chosen
+
+
+def merge_spans(*groups):
+    """Merge span lists, letting earlier stages win where spans overlap."""
+    accepted = []
+
+    spans = [span for group in groups for span in group]
+
+    for span in sorted(spans, key=lambda span: (STAGE_ORDER.index(span.stage), span.start)):
+        if all(span.end <= other.start or span.start >= other.end for other in accepted):
+            accepted.append(span)
+
+    accepted.sort()
+
+    return accepted
+
+
+# Identifies a compiled detector in caches keyed by detector
+_versions = count()
+
+
+class Detector:
+    """Staged swear detection over one shared token stream.
+
+    The text is tokenized once. Stages run in order and every span a stage
+    reports claims the tokens it covers, so later (and more expensive)
+    stages skip them. A word is therefore counted once, by the cheapest
+    stage that finds it, instead of once per stage.
+    """
+
+    STAGES = {
+        "exact": "detect_exact",
+        "regex": "detect_regex",
+        "fuzzy": "detect_fuzzy",
+        "soundalike": "detect_soundalike",
+    }
+
+    def __init__(self, badwords):
+        self.badwords = list(badwords)
+        self.version = next(_versions)
+
+        self.automaton = WordAutomaton(self.badwords)
+        self.folded = FoldedMatcher(self.badwords)
+        self.fuzzy = FuzzyIndex(self.badwords, threshold=85)
+        self.phonetic = PhoneticIndex(self.badwords)
+
+    def __setstate__(self, state):
+        # Unpickled detectors are distinct from any live one for caching
+        self.__dict__.update(state)
+        self.version = next(_versions)
+
+    # ----------------------------
+    # Stages
+    # ----------------------------
+
+    def detect_exact(self, text, tokens, claimed):
+        hits = [
+            (start, end, self.badwords[index])
+            for start, end, index in self.automaton.iter_matches(text)
+        ]
+
+        spans = [Span(start, end, word, "exact") for start, end, word in non_overlapping(hits)]
+
+        if not claimed:
+            return spans
+
+        starts = [token.start for token in tokens]
+
+        return [span for span in spans if not claimed.intersection(self.touched(starts, span))]
+
+    def detect_regex(self, text, tokens, claimed):
+        hits = []
+
+        for first, last, start, end, word in self.folded.iter_token_matches([t.text for t in tokens]):
+
+            if claimed.intersection(range(first, last + 1)):
+                continue
+
+            hits.append((start, end, first, last, word))
+
+        return [
+            Span(tokens[first].start, tokens[last].end, word, "regex")
+            for _, _, first, last, word in non_overlapping(hits)
+        ]
+
+    def detect_fuzzy(self, text, tokens, claimed):
+        free = [token for i, token in enumerate(tokens) if i not in claimed]
+
+        best = self.fuzzy.best_matches([token.text for token in free])
+
+        return [
+            Span(token.start, token.end, best[token.text], "fuzzy")
+            for token in free if token.text in best
+        ]
+
+    def detect_soundalike(self, text, tokens, claimed):
+        seen = {}
+        spans = []
+
+        for i, token in enumerate(tokens):
+
+            if i in claimed:
+                continue
+
+            if token.text not in seen:
+                seen[token.text] = self.phonetic.lookup(token.text)
+
+            if seen[token.text] is not None:
+                spans.append(Span(token.start, token.end, seen[token.text], "soundalike"))
+
+        return spans
+
+    # ----------------------------
+    # Pipeline
+    # ----------------------------
+
+    @staticmethod
+    def touched(starts, span):
+        """Indexes of the tokens (given by their start offsets) a span overlaps."""
+        first = max(bisect_right(starts, span.start) - 1, 0)
+        last = bisect_left(starts, span.end)
+
+        return range(first, last)
+
+    def detect(self, text, stages=MATCHER_STAGES["fuzzy"], timed=None, allowed=frozenset()):
+        """Return the sorted list of spans found by ``stages``.
+
+        ``timed(stage, func, *args)`` can wrap every stage call for timing.
+        ``allowed`` holds ``allow_key`` forms. Tokens that are allowed words
+        are claimed before any stage runs, so no stage can match them to a
+        neighbouring bad word, and spans whose term or covered text is
+        allowed are dropped before they claim anything.
+        """
+        tokens = tokenize(text)
+        starts = [token.start for token in tokens]
+        claimed = set()
+        spans = []
+
+        if allowed:
+            claimed.update(i for i, token in enumerate(tokens) if allow_key(token.text) in allowed)
+
+        for stage in stages:
+            func = getattr(self, self.STAGES[stage])
+
+            if timed is None:
+                found = func(text, tokens, claimed)
+            else:
+                found = timed(stage, func, text, tokens, claimed)
+
+            if allowed:
+                found = [
+                    span for span in found
+                    if allow_key(span.term) not in allowed
+                    and allow_key(text[span.start:span.end]) not in allowed
+                ]
+
+            for span in found:
+                claimed.update(self.touched(starts, span))
+
+            spans.extend(found)
+
+        spans.sort()
+
+        return spans
+
+
+class GuildDetector:
+    """A guild's view of the shared detector.
+
+    The global word list stays compiled once and shared. A guild's own
+    words are compiled into a small ``extra`` detector run alongside it,
+    and allowed words are filtered out, so changing a guild's lists never
+    recompiles the global one.
+    """
+
+    def __init__(self, base, extra=None, allowed=()):
+        self.base = base
+        self.extra = extra
+        self.allowed = frozenset(allow_key(word) for word in allowed) - {""}
+        self.version = next(_versions)
+
+    def detect(self, text, stages=MATCHER_STAGES["fuzzy"], timed=None):
+        spans = self.base.detect(text, stages, timed, self.allowed)
+
+        if self.extra is None:
+            return spans
+
+        return merge_spans(spans, self.extra.detect(text, stages, timed, self.allowed))
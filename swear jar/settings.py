@@ -0,0 +1,40 @@
+from typing import NamedTuple
+
+
+class GuildSettings(NamedTuple):
+    enabled: bool
+    fine_amount: int
+    cooldown: int
+    jackpot_threshold: int
+    jackpot_mode: str
+    matcher: str
+    custom_words: tuple
+    allowed_words: tuple
+
+
+class SettingsCache:
+    """Immutable per-guild settings snapshots held in memory.
+
+    A snapshot is read from Config the first time a guild is seen and then
+    reused until a settings command invalidates it.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.snapshots = {}
+
+    async def get(self, guild):
+        settings = self.snapshots.get(guild.id)
+
+        if settings is None:
+            data = await self.config.guild(guild).all()
+            settings = GuildSettings(**{
+                field: tuple(data[field]) if isinstance(data[field], list) else data[field]
+                for field in GuildSettings._fields
+            })
+            self.snapshots[guild.id] = settings
+
+        return settings
+
+    def invalidate(self, guild):
+        self.snapshots.pop(guild.id, None)
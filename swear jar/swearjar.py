@@ -1,19 +1,41 @@
+import asyncio
 import discord
-import re
+import hashlib
+import logging
 import time
-import tempfile
+from collections import Counter, defaultdict
 from pathlib import Path
-from rapidfuzz import fuzz
 
-import whisper
+import psutil
 
 from redbot.core import commands, Config, bank
-from redbot.core.utils.chat_formatting import humanize_number
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.chat_formatting import box, humanize_number
+
+from .artifact import load_detector
+from .audio import check_attachment, decode, speech_chunks
+from .backends import BACKENDS, get_backend, installed
+from .cache import LRUCache, TTLCache, TranscriptCache
+from .counters import CounterStore
+from .leaderboard import LeaderboardStore, sparkline, today
+from .ledger import SettlementLedger
+from .members import JACKPOT_MODES, EligibleMembers
+from .metrics import Metrics, stage
+from .pipeline import MATCHER_STAGES, Detector, GuildDetector, context_filter
+from .settings import SettingsCache
+from .transcription import TranscriptionPool
+
+
+WHISPER_MODELS = ("tiny", "base", "small")
+
+log = logging.getLogger("red.swearjar")
 
 
 class SwearJar(commands.Cog):
 
     def __init__(self, bot):
+        started = time.perf_counter()
+
         self.bot = bot
 
         self.config = Config.get_conf(self, identifier=92837423)
@@ -23,7 +45,11 @@ class SwearJar(commands.Cog):
             "jar_balance": 0,
             "fine_amount": 10,
             "cooldown": 10,
-            "jackpot_threshold": 10000
+            "jackpot_threshold": 10000,
+            "jackpot_mode": "uniform",
+            "matcher": "fuzzy",
+            "custom_words": [],
+            "allowed_words": []
         }
 
         default_user = {
@@ -31,12 +57,139 @@ class SwearJar(commands.Cog):
             "last_trigger": 0
         }
 
+        default_global = {
+            "transcribe_workers": 1,
+            "transcribe_queue_size": 20,
+            "transcribe_batch_size": 4,
+            "transcribe_batch_wait": 10,
+            "transcribe_backend": "whisper",
+            "whisper_model": "base",
+            "whisper_idle_timeout": 600,
+            "transcript_cache_size": 512,
+            "transcript_disk_cache": False,
+            "transcript_disk_size": 10000,
+            "voice_max_bytes": 10 * 1024 * 1024,
+            "voice_max_seconds": 300,
+            "voice_vad": True,
+            "voice_early_exit": False,
+            "unsettled_fines": [],
+            "metrics_enabled": True
+        }
+
         self.config.register_guild(**default_guild)
         self.config.register_user(**default_user)
+        self.config.register_global(**default_global)
+
+        # guild id -> {user id: [total, last day, daily counts]}, one value per guild
+        self.config.init_custom("LEADERBOARD", 1)
+        self.config.register_custom("LEADERBOARD", users={})
+
+        # normalized text -> detected terms, for copypasta and raid spam
+        self.detections = LRUCache(maxsize=2048)
+
+        # guild id -> detector with that guild's overrides applied
+        self.guild_detectors = {}
+        # guild id -> (custom words, compiled detector for just those words)
+        self.extra_detectors = {}
+        self.detector_generations = defaultdict(int)
+
+        self.compile_badwords(self.load_badwords())
+
+        self.settings = SettingsCache(self.config)
+        self.counters = CounterStore(self.config)
+        self.leaderboards = LeaderboardStore(self.config)
+        self.ledger = SettlementLedger(bank, self.counters)
+        self.members = EligibleMembers()
+        self.flush_tasks = []
+
+        # One-off tasks, referenced here so they aren't collected mid-run
+        self.background = set()
+
+        # message id -> (content fingerprint, detected terms) of the last scan
+        self.scans = TTLCache(maxsize=10000, ttl=3600)
+
+        self.metrics = Metrics()
+
+        self.transcriber = None
+        self.transcripts = None
+        self.transcript_key = None
+        self.voice_max_bytes = default_global["voice_max_bytes"]
+        self.voice_max_seconds = default_global["voice_max_seconds"]
+        self.voice_vad = default_global["voice_vad"]
+        self.voice_early_exit = default_global["voice_early_exit"]
+
+        self.init_time = time.perf_counter() - started
+
+    async def cog_load(self):
+        self.metrics.enabled = await self.config.metrics_enabled()
 
-        self.badwords = self.load_badwords()
+        await self.start_transcriber()
 
-        self.whisper_model = whisper.load_model("base")
+        if not self.flush_tasks:
+            self.flush_tasks = [
+                asyncio.create_task(self.counters.run()),
+                asyncio.create_task(self.leaderboards.run()),
+                asyncio.create_task(self.resume_fines())
+            ]
+
+    async def cog_unload(self):
+        for task in self.flush_tasks:
+            task.cancel()
+
+        # Let a flush that was cut off put its dirty state back first
+        await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+        self.flush_tasks = []
+
+        # Fines still waiting are settled now, and kept for next load if they can't be
+        left = await self.ledger.close()
+
+        await self.config.unsettled_fines.set([
+            [fine.member.guild.id, fine.member.id, fine.amount] for fine in left
+        ])
+
+        await self.counters.flush()
+        await self.leaderboards.flush()
+
+        for task in self.background:
+            task.cancel()
+
+        await asyncio.gather(*self.background, return_exceptions=True)
+
+        if self.transcriber:
+            await self.transcriber.close()
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+
+        self.background.add(task)
+        task.add_done_callback(self.task_done)
+
+        return task
+
+    def task_done(self, task):
+        self.background.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Background task failed", exc_info=task.exception())
+
+    async def resume_fines(self):
+
+        await self.bot.wait_until_red_ready()
+
+        fines = await self.config.unsettled_fines()
+
+        if not fines:
+            return
+
+        await self.config.unsettled_fines.set([])
+
+        for guild_id, user_id, amount in fines:
+
+            guild = self.bot.get_guild(guild_id)
+            member = guild and guild.get_member(user_id)
+
+            if member:
+                self.spawn(self.ledger.charge(member, amount))
 
     # ----------------------------
     # Load bad words
@@ -48,43 +201,73 @@ class SwearJar(commands.Cog):
         with open(path) as f:
             return [w.strip().lower() for w in f if w.strip()]
 
+    def compile_badwords(self, badwords):
+
+        started = time.perf_counter()
+
+        self.badwords = badwords
+        self.detector, self.detector_cached = load_detector(
+            self.badwords, Path(__file__).parent / "badwords.cache"
+        )
+
+        self.compile_time = time.perf_counter() - started
+
+        # Guild views wrap the old global detector
+        self.guild_detectors.clear()
+
+        # Cached results were computed against the old list
+        self.detections.clear()
+
     # ----------------------------
-    # Regex expansion detection
+    # Per-guild word lists
     # ----------------------------
 
-    def regex_detect(self, text):
+    async def build_detector(self, guild_id, settings):
 
-        count = 0
+        if not settings.custom_words and not settings.allowed_words:
+            return self.detector
 
-        for word in self.badwords:
+        extra = None
 
-            pattern = word.replace("i", "[i1!]").replace("o", "[o0]").replace("a", "[a@]")
+        if settings.custom_words:
 
-            matches = re.findall(pattern, text)
+            cached = self.extra_detectors.get(guild_id)
 
-            count += len(matches)
+            # Only the guild's own words are compiled, and only when they change
+            if cached and cached[0] == settings.custom_words:
+                extra = cached[1]
+            else:
+                extra = await asyncio.to_thread(Detector, settings.custom_words)
+                self.extra_detectors[guild_id] = (settings.custom_words, extra)
+        else:
+            self.extra_detectors.pop(guild_id, None)
 
-        return count
+        return GuildDetector(self.detector, extra, settings.allowed_words)
 
-    # ----------------------------
-    # Phonetic / fuzzy detection
-    # ----------------------------
+    async def get_detector(self, guild, settings):
+
+        detector = self.guild_detectors.get(guild.id)
 
-    def phonetic_detect(self, text):
+        if detector is None:
+            detector = await self.build_detector(guild.id, settings)
+            self.guild_detectors.setdefault(guild.id, detector)
 
-        words = text.split()
+        return detector
 
-        matches = 0
+    async def refresh_detector(self, guild):
 
-        for w in words:
-            for bad in self.badwords:
+        self.settings.invalidate(guild)
 
-                score = fuzz.ratio(w, bad)
+        self.detector_generations[guild.id] += 1
+        generation = self.detector_generations[guild.id]
 
-                if score > 85:
-                    matches += 1
+        settings = await self.settings.get(guild)
+        detector = await self.build_detector(guild.id, settings)
 
-        return matches
+        # The previous detector keeps serving until this one is ready, unless
+        # a newer change finished first
+        if self.detector_generations[guild.id] == generation:
+            self.guild_detectors[guild.id] = detector
 
     # ----------------------------
     # Context filter
@@ -92,55 +275,125 @@ class SwearJar(commands.Cog):
 
     def context_filter(self, text):
 
-        allowed_contexts = [
-            "swear word list",
-            "example swear",
-            "dictionary",
-            "quote"
-        ]
-
-        for ctx in allowed_contexts:
-            if ctx in text:
-                return False
-
-        return True
+        return context_filter(text)
 
     # ----------------------------
     # Speech transcription
     # ----------------------------
 
-    async def transcribe(self, attachment):
+    async def start_transcriber(self):
+
+        if self.transcriber:
+            await self.transcriber.close()
+
+        settings = await self.config.all()
+
+        backend = get_backend(settings["transcribe_backend"], settings["whisper_model"])
+
+        self.transcriber = TranscriptionPool(
+            backend.load,
+            backend.transcribe,
+            workers=settings["transcribe_workers"],
+            queue_size=settings["transcribe_queue_size"],
+            idle_timeout=settings["whisper_idle_timeout"],
+            run_batch=backend.transcribe_batch,
+            batch_size=settings["transcribe_batch_size"],
+            batch_wait=settings["transcribe_batch_wait"] / 1000
+        )
+
+        self.transcriber.start()
+
+        transcript_key = f"{backend.name}:{settings['whisper_model']}"
+
+        # Transcripts depend on the model, so a new model starts a new cache
+        if self.transcripts is None or self.transcript_key != transcript_key:
+            self.transcripts = TranscriptCache(
+                maxsize=settings["transcript_cache_size"],
+                path=cog_data_path(self) / "transcripts" if settings["transcript_disk_cache"] else None,
+                disk_maxsize=settings["transcript_disk_size"]
+            )
+
+        self.transcript_key = transcript_key
+        self.voice_max_bytes = settings["voice_max_bytes"]
+        self.voice_max_seconds = settings["voice_max_seconds"]
+        self.voice_vad = settings["voice_vad"]
+        self.voice_early_exit = settings["voice_early_exit"]
+
+    async def transcribe(self, attachment, found=None):
+
+        cached = self.transcripts.get_id(attachment.id)
+
+        if cached is not None:
+            return cached
+
+        # Oversized clips are turned away before they cost a download
+        check_attachment(attachment, self.voice_max_bytes, self.voice_max_seconds)
+
+        data = await attachment.read()
+
+        digest = hashlib.sha256(self.transcript_key.encode() + b"\0" + data).hexdigest()
+
+        cached = await self.transcripts.get_hash(digest)
+
+        if cached is None:
+
+            audio = await asyncio.to_thread(decode, data, self.voice_max_seconds)
 
-        with tempfile.NamedTemporaryFile(suffix=".ogg") as tmp:
+            # Silence is dropped and long clips spread over the workers
+            if self.voice_vad:
+                chunks = await asyncio.to_thread(speech_chunks, audio)
+            else:
+                chunks = [audio]
 
-            await attachment.save(tmp.name)
+            texts = await self.transcriber.map(
+                chunks, found if self.voice_early_exit else None
+            )
 
-            result = self.whisper_model.transcribe(tmp.name)
+            cached = " ".join(text.strip() for text in texts if text)
 
-            return result["text"]
+            # A transcript cut short by an early exit isn't worth keeping
+            if None in texts:
+                return cached
+
+        await self.transcripts.put(attachment.id, digest, cached)
+
+        return cached
 
     # ----------------------------
     # Core swear detection
     # ----------------------------
 
-    def detect_swears(self, text):
+    def detect_spans(self, text, matcher="fuzzy", detector=None, trace=None):
+
+        detector = detector or self.detector
+
+        # Edge whitespace never changes a match, so it's left out of the key
+        text = text.lower().strip()
+
+        key = (detector.version, matcher, text)
 
-        text = text.lower()
+        spans = self.detections.get(key)
 
-        if not self.context_filter(text):
-            return 0
+        if spans is None:
 
-        count = 0
+            if self.context_filter(text):
+                spans = tuple(detector.detect(
+                    text, MATCHER_STAGES[matcher], trace.timed if trace else None
+                ))
+            else:
+                spans = ()
 
-        for word in self.badwords:
+            self.detections.put(key, spans)
 
-            count += len(re.findall(rf"\b{re.escape(word)}\b", text))
+        return spans
 
-        count += self.regex_detect(text)
+    def detect_terms(self, text, matcher="fuzzy", detector=None, trace=None):
 
-        count += self.phonetic_detect(text)
+        return Counter(span.term for span in self.detect_spans(text, matcher, detector, trace))
 
-        return count
+    def detect_swears(self, text, matcher="fuzzy", detector=None):
+
+        return len(self.detect_spans(text, matcher, detector))
 
     # ----------------------------
     # Cooldown system
@@ -148,56 +401,41 @@ class SwearJar(commands.Cog):
 
     async def check_cooldown(self, user, guild):
 
-        cooldown = await self.config.guild(guild).cooldown()
-
-        last = await self.config.user(user).last_trigger()
-
-        if time.time() - last < cooldown:
-            return False
-
-        await self.config.user(user).last_trigger.set(time.time())
+        settings = await self.settings.get(guild)
 
-        return True
+        return await self.counters.check_cooldown(user.id, settings.cooldown)
 
     # ----------------------------
     # Handle violation
     # ----------------------------
 
-    async def process_violation(self, message, swears):
+    async def process_violation(self, message, swears, trace=None):
 
         guild = message.guild
         user = message.author
 
-        if not await self.check_cooldown(user, guild):
-            return
-
-        fine = await self.config.guild(guild).fine_amount()
-
-        total = fine * swears
+        with stage(trace, "settings"):
+            if not await self.check_cooldown(user, guild):
+                return
 
-        balance = await bank.get_balance(user)
+            fine = (await self.settings.get(guild)).fine_amount
 
-        if balance < total:
-            total = balance
+        with stage(trace, "bank"):
+            total, jar = await self.ledger.charge(user, fine * swears)
 
         if total <= 0:
             return
 
-        await bank.withdraw_credits(user, total)
-
-        jar = await self.config.guild(guild).jar_balance()
-        jar += total
-
-        await self.config.guild(guild).jar_balance.set(jar)
+        with stage(trace, "jar"):
+            self.counters.add_swears(user.id, swears)
 
-        count = await self.config.user(user).swear_count()
-        count += swears
+            await self.leaderboards.add(guild.id, user.id, swears)
 
-        await self.config.user(user).swear_count.set(count)
+        with stage(trace, "jackpot"):
+            await self.check_jackpot(message.channel, guild)
 
-        await self.check_jackpot(message.channel, guild)
-
-        currency = await bank.get_currency_name(guild)
+        with stage(trace, "bank"):
+            currency = await bank.get_currency_name(guild)
 
         embed = discord.Embed(
             title="Swear Jar Triggered",
@@ -210,7 +448,8 @@ class SwearJar(commands.Cog):
         embed.add_field(name="Fine", value=f"{humanize_number(total)} {currency}")
         embed.add_field(name="Jar", value=f"{humanize_number(jar)} {currency}")
 
-        await message.channel.send(embed=embed)
+        with stage(trace, "notify"):
+            await message.channel.send(embed=embed)
 
     # ----------------------------
     # Jackpot system
@@ -218,20 +457,31 @@ class SwearJar(commands.Cog):
 
     async def check_jackpot(self, channel, guild):
 
-        threshold = await self.config.guild(guild).jackpot_threshold()
+        settings = await self.settings.get(guild)
+        threshold = settings.jackpot_threshold
 
-        jar = await self.config.guild(guild).jar_balance()
-
-        if jar < threshold:
+        if await self.counters.jar(guild.id) < threshold:
             return
 
-        members = [m for m in guild.members if not m.bot]
+        # Fines settle under the same lock, so the jar can't move underneath us
+        # and two violations can't both pay out the same jackpot
+        async with self.ledger.locks[guild.id]:
+
+            if await self.counters.jar(guild.id) < threshold:
+                return
 
-        winner = members[int(time.time()) % len(members)]
+            winner = self.members.pick(guild, settings.jackpot_mode)
 
-        await bank.deposit_credits(winner, jar)
+            # Nobody can win, so the jar keeps filling
+            if winner is None:
+                return
 
-        await self.config.guild(guild).jar_balance.set(0)
+            jar = await self.counters.jar(guild.id)
+
+            # Paid out first, so a deposit that fails leaves the jar as it was
+            await bank.deposit_credits(winner, jar)
+
+            await self.counters.empty_jar(guild.id)
 
         currency = await bank.get_currency_name(guild)
 
@@ -243,34 +493,86 @@ class SwearJar(commands.Cog):
     # Message processing
     # ----------------------------
 
-    async def process_message(self, message):
+    @staticmethod
+    def fingerprint(message):
 
-        if message.author.bot:
-            return
+        return hash((message.content, tuple(a.id for a in message.attachments)))
 
-        if not message.guild:
-            return
+    async def scan_message(self, message, settings, trace=None):
 
-        if not await self.config.guild(message.guild).enabled():
-            return
+        matcher = settings.matcher
 
-        total_swears = 0
+        with stage(trace, "detector"):
+            detector = await self.get_detector(message.guild, settings)
+
+        terms = Counter()
 
         if message.content:
-            total_swears += self.detect_swears(message.content)
+            terms += self.detect_terms(message.content, matcher, detector, trace)
 
         for attachment in message.attachments:
 
             if attachment.content_type and "audio" in attachment.content_type:
 
                 try:
-                    transcript = await self.transcribe(attachment)
-                    total_swears += self.detect_swears(transcript)
+                    with stage(trace, "transcribe"):
+                        transcript = await self.transcribe(
+                            attachment,
+                            lambda text: bool(self.detect_spans(text, matcher, detector))
+                        )
+
+                    terms += self.detect_terms(transcript, matcher, detector, trace)
                 except Exception:
                     pass
 
+        return terms
+
+    async def process_message(self, message, edited=False):
+
+        if message.author.bot:
+            return
+
+        if not message.guild:
+            return
+
+        self.members.seen(message.guild.id, message.author.id)
+
+        trace = self.metrics.trace(message)
+
+        try:
+            await self.handle_message(message, edited, trace)
+        finally:
+            if trace:
+                self.metrics.record(trace)
+
+    async def handle_message(self, message, edited, trace):
+
+        fingerprint = self.fingerprint(message)
+
+        previous = self.scans.get(message.id) if edited else None
+
+        # Embeds resolving, pins and the like: nothing to rescan
+        if previous and previous[0] == fingerprint:
+            return
+
+        with stage(trace, "settings"):
+            settings = await self.settings.get(message.guild)
+
+        if not settings.enabled:
+            return
+
+        terms = await self.scan_message(message, settings, trace)
+
+        self.scans.put(message.id, (fingerprint, terms))
+
+        # Only fine an edit for what it added on top of the last scan
+        if previous:
+            terms = terms - previous[1]
+
+        total_swears = sum(terms.values())
+
         if total_swears > 0:
-            await self.process_violation(message, total_swears)
+            await self.process_violation(message, total_swears, trace)
 
     # ----------------------------
     # Listeners
@@ -282,7 +584,27 @@ class SwearJar(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
-        await self.process_message(after)
+
+        if before.content == after.content and before.attachments == after.attachments:
+            return
+
+        await self.process_message(after, edited=True)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.members.update(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        self.members.update(after)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        self.members.remove(payload.guild_id, payload.user.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.members.forget(guild.id)
 
     # ----------------------------
     # Commands
@@ -298,6 +620,7 @@ class SwearJar(commands.Cog):
     async def fine(self, ctx, amount: int):
 
         await self.config.guild(ctx.guild).fine_amount.set(amount)
+        self.settings.invalidate(ctx.guild)
 
         currency = await bank.get_currency_name(ctx.guild)
 
@@ -307,6 +630,7 @@ class SwearJar(commands.Cog):
     async def cooldown(self, ctx, seconds: int):
 
         await self.config.guild(ctx.guild).cooldown.set(seconds)
+        self.settings.invalidate(ctx.guild)
 
         await ctx.send(f"Cooldown set to {seconds}s")
 
@@ -314,7 +638,422 @@ class SwearJar(commands.Cog):
     async def jackpot(self, ctx, amount: int):
 
         await self.config.guild(ctx.guild).jackpot_threshold.set(amount)
+        self.settings.invalidate(ctx.guild)
 
         currency = await bank.get_currency_name(ctx.guild)
 
         await ctx.send(f"Jackpot threshold set to {amount} {currency}")
+
+    @swearjar.command()
+    async def jackpotmode(self, ctx, mode: str):
+
+        mode = mode.lower()
+
+        if mode not in JACKPOT_MODES:
+            await ctx.send(f"Jackpot mode must be one of: {', '.join(JACKPOT_MODES)}")
+            return
+
+        await self.config.guild(ctx.guild).jackpot_mode.set(mode)
+        self.settings.invalidate(ctx.guild)
+
+        await ctx.send(f"Jackpot winners are drawn {'by recent activity' if mode == 'active' else 'uniformly'}")
+
+    @swearjar.command()
+    async def matcher(self, ctx, mode: str):
+
+        mode = mode.lower()
+
+        if mode not in ("fuzzy", "soundalike", "both"):
+            await ctx.send("Matcher must be one of: fuzzy, soundalike, both")
+            return
+
+        await self.config.guild(ctx.guild).matcher.set(mode)
+        self.settings.invalidate(ctx.guild)
+
+        await ctx.send(f"Matcher set to {mode}")
+
+    @staticmethod
+    def format_timings(title, summary):
+
+        if not summary:
+            return f"{title}: no messages timed yet"
+
+        lines = [
+            title,
+            f"{'stage':<11}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  ms"
+        ]
+
+        # Stages that cost the most overall first, the whole message last
+        order = sorted(
+            summary, key=lambda name: (name == "total", -summary[name]["mean"] * summary[name]["count"])
+        )
+
+        for name in order:
+            s = summary[name]
+            lines.append(
+                f"{name:<11}{s['count']:>8}"
+                + "".join(f"{s[key] * 1000:>9.2f}" for key in ("mean", "p50", "p95", "p99", "max"))
+            )
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def format_slowest(messages, with_guild=False):
+
+        lines = []
+
+        for m in messages:
+            share = m.stage_time / m.total if m.total else 0.0
+            where = f"guild {m.guild_id}, " if with_guild else ""
+            lines.append(
+                f"{m.total * 1000:.1f} ms ({where}{m.stage} {share:.0%}): "
+                f"https://discord.com/channels/{m.guild_id}/{m.channel_id}/{m.message_id}"
+            )
+
+        return "\n".join(lines) or "No messages timed yet."
+
+    # Leaderboards are for everyone, so they live outside the admin group
+    @commands.group()
+    @commands.guild_only()
+    async def swears(self, ctx):
+        pass
+
+    @swears.command()
+    async def top(self, ctx, count: int = 10):
+
+        count = max(1, min(count, 25))
+
+        board = await self.leaderboards.board(ctx.guild.id)
+
+        if not len(board):
+            await ctx.send("Nobody has sworn here yet.")
+            return
+
+        lines = []
+
+        for position, (user_id, total) in enumerate(board.top(count), start=1):
+            member = ctx.guild.get_member(user_id)
+            name = member.display_name if member else f"Former member {user_id}"
+            lines.append(f"{position:>3}. {name}: {humanize_number(total)}")
+
+        await ctx.send(box("\n".join(lines)))
+
+    @swears.command()
+    async def stats(self, ctx, member: discord.Member = None):
+
+        member = member or ctx.author
+
+        board = await self.leaderboards.board(ctx.guild.id)
+        stats = board.stats(member.id, today())
+
+        if not stats["total"]:
+            await ctx.send(f"{member.display_name} hasn't sworn here yet.")
+            return
+
+        daily = stats["daily"]
+
+        await ctx.send(box(
+            f"{member.display_name}\n"
+            f"Swears:       {humanize_number(stats['total'])} (#{stats['rank']} of {stats['members']})\n"
+            f"Today:        {daily[-1]}\n"
+            f"Last 30 days: {sum(daily)}\n"
+            f"{sparkline(daily)}"
+        ))
+
+    @swearjar.command()
+    async def timings(self, ctx, scope: str = "guild"):
+
+        if scope.lower() == "all":
+
+            if not await self.bot.is_owner(ctx.author):
+                await ctx.send("Only the bot owner can see other servers' messages.")
+                return
+
+            await ctx.send("Slowest recent messages, all servers:\n" + self.format_slowest(
+                self.metrics.slowest(n=10), with_guild=True
+            ))
+            return
+
+        if not self.metrics.enabled:
+            await ctx.send("Timing is turned off, see `swearjar metrics`.")
+
+        await ctx.send(box(self.format_timings("This server", self.metrics.summary(ctx.guild.id))))
+        await ctx.send(box(self.format_timings("All servers", self.metrics.summary())))
+
+        await ctx.send("Slowest recent messages here:\n" + self.format_slowest(
+            self.metrics.slowest(ctx.guild.id)
+        ))
+
+        lines = []
+
+        lines.append(
+            f"word list: {len(self.badwords)} words, "
+            f"{'loaded from cache' if self.detector_cached else 'compiled'} in {self.compile_time * 1000:.1f} ms"
+        )
+
+        ledger = self.ledger.stats()
+
+        lines.append(
+            f"fines: {ledger['fines']} settled in {ledger['batches']} batches with {ledger['bank_calls']} bank calls, "
+            f"{ledger['pending']} pending, {ledger['retried']} retried, {ledger['failed']} failed"
+        )
+
+        cache = self.detections.stats()
+
+        lines.append(
+            f"detection cache: {cache['size']}/{cache['maxsize']} entries, "
+            f"{cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})"
+        )
+
+        await ctx.send(box("\n".join(lines)))
+
+    @swearjar.command(name="metrics")
+    @commands.is_owner()
+    async def metrics_mode(self, ctx, mode: str):
+
+        mode = mode.lower()
+
+        if mode == "reset":
+            self.metrics.reset()
+            await ctx.send("Timings reset")
+            return
+
+        if mode not in ("on", "off"):
+            await ctx.send("Mode must be one of: on, off, reset")
+            return
+
+        self.metrics.enabled = mode == "on"
+        await self.config.metrics_enabled.set(self.metrics.enabled)
+
+        await ctx.send(f"Timing turned {mode}")
+
+    @swearjar.command()
+    async def voice(self, ctx):
+
+        stats = self.transcriber.stats()
+
+        model = self.transcript_key
+        idle = await self.config.whisper_idle_timeout()
+
+        rss = psutil.Process().memory_info().rss
+
+        await ctx.send(box(
+            f"Model:       {model} ({stats['loaded']}/{stats['workers']} loaded, idle unload after {idle}s)\n"
+            f"Loads:       {stats['loads']} (last took {stats['last_load_time']:.2f}s), unloads: {stats['unloads']}\n"
+            f"Cog init:    {self.init_time * 1000:.1f} ms\n"
+            f"Bot RSS:     {rss / 1024 / 1024:.0f} MB\n"
+            f"Workers:     {stats['workers']}\n"
+            f"Batching:    up to {stats['batch_size']}, {stats['avg_batch']:.1f} clips per pass on average\n"
+            f"Queue:       {stats['queued']}/{stats['capacity']}\n"
+            f"In flight:   {stats['in_flight']}\n"
+            f"Processed:   {stats['processed']}\n"
+            f"Dropped:     {stats['dropped']}\n"
+            f"Failed:      {stats['failed']}\n"
+            f"Avg wait:    {stats['avg_wait']:.2f}s\n"
+            f"Avg latency: {stats['avg_latency']:.2f}s\n"
+            f"Limits:      {self.voice_max_bytes / 1024 / 1024:.1f} MB, {self.voice_max_seconds}s\n"
+            f"Splitting:   {'silence trimmed' if self.voice_vad else 'whole clips'}"
+            f"{', stops at first swear' if self.voice_early_exit else ''}"
+        ))
+
+        cache = self.transcripts.stats()
+
+        await ctx.send(box(
+            f"Transcript cache ({'memory + disk' if cache['disk'] else 'memory'})\n"
+            f"By attachment: {cache['id']['hits']} hits / {cache['id']['misses']} misses "
+            f"({cache['id']['size']}/{cache['id']['maxsize']})\n"
+            f"By content:    {cache['hash']['hits']} hits / {cache['hash']['misses']} misses "
+            f"({cache['hash']['size']}/{cache['hash']['maxsize']})\n"
+            f"Disk hits:     {cache['disk_hits']}, {cache['disk_evictions']} evicted "
+            f"(cap {cache['disk_maxsize']} files)"
+        ))
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voiceworkers(self, ctx, workers: int):
+
+        if workers < 1:
+            await ctx.send("Need at least one worker.")
+            return
+
+        await self.config.transcribe_workers.set(workers)
+        await self.start_transcriber()
+
+        await ctx.send(f"Transcription workers set to {workers}")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicequeue(self, ctx, size: int):
+
+        if size < 1:
+            await ctx.send("Queue size must be at least 1.")
+            return
+
+        await self.config.transcribe_queue_size.set(size)
+        await self.start_transcriber()
+
+        await ctx.send(f"Transcription queue size set to {size}")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicebatch(self, ctx, size: int, wait_ms: int = 10):
+
+        if size < 1 or wait_ms < 0:
+            await ctx.send("Batch size must be at least 1 and the wait can't be negative.")
+            return
+
+        await self.config.transcribe_batch_size.set(size)
+        await self.config.transcribe_batch_wait.set(wait_ms)
+        await self.start_transcriber()
+
+        if size == 1:
+            await ctx.send("Voice clips are transcribed one at a time")
+        else:
+            await ctx.send(f"Up to {size} voice clips share a model pass, waiting at most {wait_ms} ms")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicebackend(self, ctx, name: str):
+
+        name = name.lower()
+
+        if name not in BACKENDS:
+            await ctx.send(f"Backend must be one of: {', '.join(BACKENDS)}")
+            return
+
+        if not installed(name):
+            await ctx.send(f"{name} isn't installed, run `{ctx.clean_prefix}pipinstall {BACKENDS[name].package}` first.")
+            return
+
+        await self.config.transcribe_backend.set(name)
+        await self.start_transcriber()
+
+        await ctx.send(f"Transcription backend set to {name}, it loads on the next voice message")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicemodel(self, ctx, size: str):
+
+        size = size.lower()
+
+        if size not in WHISPER_MODELS:
+            await ctx.send(f"Model must be one of: {', '.join(WHISPER_MODELS)}")
+            return
+
+        await self.config.whisper_model.set(size)
+        await self.start_transcriber()
+
+        await ctx.send(f"Whisper model set to {size}, it loads on the next voice message")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voiceidle(self, ctx, seconds: int):
+
+        if seconds < 1:
+            await ctx.send("Idle timeout must be at least 1 second.")
+            return
+
+        await self.config.whisper_idle_timeout.set(seconds)
+
+        self.transcriber.idle_timeout = seconds
+
+        await ctx.send(f"Whisper models unload after {seconds}s idle")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicelimit(self, ctx, megabytes: float, seconds: int):
+
+        if megabytes <= 0 or seconds < 1:
+            await ctx.send("Limits must be positive.")
+            return
+
+        self.voice_max_bytes = int(megabytes * 1024 * 1024)
+        self.voice_max_seconds = seconds
+
+        await self.config.voice_max_bytes.set(self.voice_max_bytes)
+        await self.config.voice_max_seconds.set(seconds)
+
+        await ctx.send(f"Voice clips over {megabytes} MB or {seconds}s are skipped")
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicesplit(self, ctx, vad: bool, early_exit: bool = False):
+
+        self.voice_vad = vad
+        self.voice_early_exit = early_exit
+
+        await self.config.voice_vad.set(vad)
+        await self.config.voice_early_exit.set(early_exit)
+
+        await ctx.send(
+            f"Voice clips are {'trimmed and split' if vad else 'transcribed whole'}"
+            f"{', stopping at the first swear' if early_exit else ''}"
+        )
+
+    @swearjar.command()
+    @commands.is_owner()
+    async def voicecache(self, ctx, size: int, disk: bool = False, disk_size: int = 10000):
+
+        if size < 1 or disk_size < 1:
+            await ctx.send("Cache sizes must be at least 1.")
+            return
+
+        await self.config.transcript_cache_size.set(size)
+        await self.config.transcript_disk_cache.set(disk)
+        await self.config.transcript_disk_size.set(disk_size)
+
+        self.transcripts = None
+        await self.start_transcriber()
+
+        await ctx.send(
+            f"Transcript cache holds {size} entries"
+            f"{f' with a disk tier of up to {disk_size} files' if disk else ''}"
+        )
+
+    @swearjar.group()
+    async def words(self, ctx):
+        pass
+
+    async def edit_word_list(self, ctx, field, add, words):
+
+        words = {w.strip().lower() for w in words if w.strip()}
+
+        if not words:
+            await ctx.send_help()
+            return
+
+        async with getattr(self.config.guild(ctx.guild), field)() as current:
+            if add:
+                current.extend(sorted(words - set(current)))
+            else:
+                current[:] = [w for w in current if w not in words]
+
+        self.spawn(self.refresh_detector(ctx.guild))
+
+        await ctx.tick()
+
+    @words.command(name="add")
+    async def words_add(self, ctx, *words: str):
+        await self.edit_word_list(ctx, "custom_words", True, words)
+
+    @words.command(name="remove")
+    async def words_remove(self, ctx, *words: str):
+        await self.edit_word_list(ctx, "custom_words", False, words)
+
+    @words.command(name="allow")
+    async def words_allow(self, ctx, *words: str):
+        await self.edit_word_list(ctx, "allowed_words", True, words)
+
+    @words.command(name="unallow")
+    async def words_unallow(self, ctx, *words: str):
+        await self.edit_word_list(ctx, "allowed_words", False, words)
+
+    @words.command(name="list")
+    async def words_list(self, ctx):
+
+        settings = await self.settings.get(ctx.guild)
+
+        await ctx.send(box(
+            f"Added:   {', '.join(settings.custom_words) or 'none'}\n"
+            f"Allowed: {', '.join(settings.allowed_words) or 'none'}"
+        ))
@@ -0,0 +1,281 @@
+import asyncio
+import gc
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when a job is dropped because the transcription queue is full."""
+
+
+class PoolClosed(Exception):
+    """Raised for jobs that were still waiting or running when the pool closed."""
+
+
+class TranscriptionPool:
+    """Bounded pool that runs speech-to-text jobs off the event loop.
+
+    Jobs wait in an asyncio queue in front of ``workers`` executor threads.
+    Whisper models are not safe to share between concurrent decodes, so
+    every worker loads and keeps its own model. When the queue is full new
+    jobs are dropped instead of piling up behind a slow model.
+
+    Models are loaded on a worker's first job and dropped again once the
+    worker has been idle for ``idle_timeout`` seconds.
+
+    With ``run_batch`` set, a worker that picks up a job also takes up to
+    ``batch_size - 1`` more, waiting at most ``batch_wait`` seconds for
+    them, and runs them in one ``run_batch(model, jobs)`` call.
+    """
+
+    def __init__(self, load, run, workers=1, queue_size=20, idle_timeout=600,
+                 run_batch=None, batch_size=1, batch_wait=0.01):
+        self.load = load
+        self.run = run
+        self.run_batch = run_batch
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size if run_batch else 1
+        self.batch_wait = batch_wait
+
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="swearjar-transcribe"
+        )
+        self.models = [None] * workers
+        self.last_used = [0.0] * workers
+        self.busy = [False] * workers
+        self.tasks = []
+        self.feeders = set()
+
+        # Replicas load one at a time so they share the first download
+        self.load_lock = threading.Lock()
+        self.loads = 0
+        self.unloads = 0
+        self.last_load_time = 0.0
+
+        self.in_flight = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=100)
+        self.waits = deque(maxlen=100)
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [
+                asyncio.create_task(self._worker(slot)) for slot in range(self.workers)
+            ]
+            self.tasks.append(asyncio.create_task(self._reaper()))
+
+    async def close(self):
+        feeders = list(self.feeders)
+
+        for task in self.tasks + feeders:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, *feeders, return_exceptions=True)
+        self.tasks = []
+
+        while not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(PoolClosed())
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self):
+        with self.load_lock:
+            start = time.perf_counter()
+            model = self.load()
+            self.last_load_time = time.perf_counter() - start
+            self.loads += 1
+            return model
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(max(1, min(60, self.idle_timeout / 4)))
+
+            now = time.monotonic()
+            evicted = False
+
+            for slot, model in enumerate(self.models):
+                if model is None or self.busy[slot]:
+                    continue
+
+                if now - self.last_used[slot] >= self.idle_timeout:
+                    self.models[slot] = None
+                    self.unloads += 1
+                    evicted = True
+
+            if evicted:
+                gc.collect()
+
+    def _put(self, job):
+        """Queue ``job`` now or raise ``QueueFull``; returns its future."""
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            self.queue.put_nowait((job, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            raise QueueFull() from None
+
+        return future
+
+    async def submit(self, job):
+        """Queue ``job`` and wait for its transcript."""
+        return await self._put(job)
+
+    async def _feed(self, jobs, futures):
+        """Queue the rest of a clip's jobs as slots free up."""
+        try:
+            for job, future in zip(jobs, futures):
+                if not future.cancelled():
+                    await self.queue.put((job, future, time.perf_counter()))
+        except asyncio.CancelledError:
+            # Closed before these were queued, so nothing will run them
+            for future in futures:
+                if not future.done():
+                    future.set_exception(PoolClosed())
+            raise
+
+    async def map(self, jobs, stop=None):
+        """Run ``jobs`` across the workers and return their results in order.
+
+        Only the first job has to find a free slot, and a full queue drops
+        the whole clip there (counted once in ``dropped``). The rest wait
+        for room, so a clip with more jobs than the queue holds still runs.
+
+        Once ``stop(result)`` is true for any result, jobs that haven't
+        finished are cancelled and come back as None. Queued jobs are
+        skipped; a job already running finishes but is ignored.
+        """
+        if not jobs:
+            return []
+
+        loop = asyncio.get_running_loop()
+
+        futures = [self._put(jobs[0])]
+        futures += [loop.create_future() for _ in jobs[1:]]
+
+        feeder = asyncio.create_task(self._feed(jobs[1:], futures[1:]))
+        self.feeders.add(feeder)
+        feeder.add_done_callback(self.feeders.discard)
+
+        try:
+            if stop is None:
+                return await asyncio.gather(*futures)
+
+            for future in asyncio.as_completed(futures):
+                if stop(await future):
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+
+            feeder.cancel()
+
+        return [
+            future.result() if future.done() and not future.cancelled() and future.exception() is None else None
+            for future in futures
+        ]
+
+    def _take(self, batch):
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _worker(self, slot):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+
+            try:
+                if self.batch_size > 1:
+                    self._take(batch)
+
+                    # Give clips arriving at nearly the same moment a chance to join
+                    if len(batch) < self.batch_size and self.batch_wait > 0:
+                        await asyncio.sleep(self.batch_wait)
+                        self._take(batch)
+
+                live = [(job, future, queued) for job, future, queued in batch if not future.cancelled()]
+
+                if not live:
+                    continue
+
+                jobs = [job for job, _, _ in live]
+
+                started = time.perf_counter()
+                self.in_flight += len(live)
+                self.busy[slot] = True
+
+                try:
+                    if self.models[slot] is None:
+                        self.models[slot] = await loop.run_in_executor(self.executor, self._load)
+
+                    if len(jobs) > 1:
+                        results = await loop.run_in_executor(
+                            self.executor, self.run_batch, self.models[slot], jobs
+                        )
+                    else:
+                        results = [await loop.run_in_executor(
+                            self.executor, self.run, self.models[slot], jobs[0]
+                        )]
+                except Exception as e:
+                    self.failed += len(live)
+                    for _, future, _ in live:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    self.processed += len(live)
+                    for (_, future, _), result in zip(live, results):
+                        if not future.done():
+                            future.set_result(result)
+                finally:
+                    self.in_flight -= len(live)
+                    self.busy[slot] = False
+                    self.last_used[slot] = time.monotonic()
+
+                self.batches += 1
+
+                finished = time.perf_counter()
+                for _, _, queued in live:
+                    self.waits.append(started - queued)
+                    self.latencies.append(finished - queued)
+            except asyncio.CancelledError:
+                # Closed mid-batch: nothing will finish these, so fail them
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(PoolClosed())
+                raise
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def stats(self):
+        def average(values):
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batch_size": self.batch_size,
+            "avg_batch": self.processed / self.batches if self.batches else 0.0,
+            "avg_wait": average(self.waits),
+            "avg_latency": average(self.latencies),
+            "loaded": sum(model is not None for model in self.models),
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "last_load_time": self.last_load_time,
+        }
+